@@ -1,21 +1,44 @@
-from dotenv import load_dotenv
 import os
-load_dotenv()
+import hashlib
 import logging
-import openai
-openai.api_key = os.getenv("OPENAI_API_KEY")
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Union
 
-def generate_report(summary_input: str, output_file="experiment_report.md"):
+REPORT_CACHE_DIR = ".report_cache"
+
+def _openai():
+    # openai and dotenv are slow to import and only needed for reports, so they are loaded on first use
+    from dotenv import load_dotenv
+    import openai
+    load_dotenv()
+    openai.api_key = os.getenv("OPENAI_API_KEY")
+    return openai
+
+class ReportBackend:
     """
-    Generates a Markdown report summarizing the experiment results using an AI assistant.
-    
-    Args:
-        experiment_results (List[ExperimentResults]): List of experiment results
-        output_file (str): Path to save the Markdown report
+    Turns a Markdown summary of an experiment into a report. cache_key identifies the backend
+    and its settings, so cached reports of different backends do not collide.
     """
-    
-    # Prompt AI model to summarize findings
-    prompt = f"""
+    def render(self, summary_input: str) -> str:
+        raise NotImplementedError
+
+    @property
+    def cache_key(self) -> str:
+        return type(self).__name__
+
+class OpenAIBackend(ReportBackend):
+    def __init__(self, model="gpt-4", max_tokens=1500):
+        self.model = model
+        self.max_tokens = max_tokens
+
+    @property
+    def cache_key(self) -> str:
+        return f"openai:{self.model}:{self.max_tokens}"
+
+    def render(self, summary_input: str) -> str:
+        # Prompt AI model to summarize findings
+        prompt = f"""
     You are a data scientist expert. Based on the following experiment results, write a concise and professional Markdown report, including key statistical findings, interpretation, and recommendations.
 
     ### Experiment:
@@ -29,16 +52,77 @@ def generate_report(summary_input: str, output_file="experiment_report.md"):
 
     ### Output Report:
     """
-
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-4",
+        response = _openai().chat.completions.create(
+            model=self.model,
             messages=[{"role": "system", "content": "You are an expert statistician."},
                         {"role": "user", "content": prompt}],
-            max_tokens=1500
+            max_tokens=self.max_tokens
         )
+        return response.choices[0].message.content
+
+class TemplateBackend(ReportBackend):
+    # Deterministic Markdown report that needs no network, for offline runs and as a stand-in for the LLM
+    def __init__(self, title="Experiment Report"):
+        self.title = title
+
+    @property
+    def cache_key(self) -> str:
+        return f"template:{self.title}"
+
+    def render(self, summary_input: str) -> str:
+        lines = summary_input.splitlines()
+        conclusions = [line.split(":", 1)[1].strip() for line in lines if line.strip().startswith("Conclusion:")]
+        rejected = sum(1 for conclusion in conclusions if conclusion.startswith("Reject"))
+        report = [f"# {self.title}", "", "## Summary", ""]
+        if conclusions:
+            report.append(f"The null hypothesis was rejected in {rejected} of {len(conclusions)} experiments.")
+            report.append("")
+        report += ["## Details", "", summary_input.strip(), ""]
+        return "\n".join(report)
 
-        report_content = response.choices[0].message.content
+REPORT_BACKENDS = {"openai": OpenAIBackend, "template": TemplateBackend}
+
+def _backend(backend: Union[str, ReportBackend, None]) -> ReportBackend:
+    if backend is None:
+        return OpenAIBackend()
+    if isinstance(backend, str):
+        if backend not in REPORT_BACKENDS:
+            raise ValueError(f"Unknown report backend '{backend}', expected one of {tuple(REPORT_BACKENDS)}")
+        return REPORT_BACKENDS[backend]()
+    return backend
+
+def report_cache_path(summary_input: str, backend: ReportBackend, cache_dir=REPORT_CACHE_DIR) -> str:
+    digest = hashlib.sha256(f"{backend.cache_key}\n{summary_input}".encode()).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.md")
+
+def generate_report(summary_input: str, output_file="experiment_report.md", backend: Union[str, ReportBackend, None] = None,
+                    cache_dir: Optional[str] = REPORT_CACHE_DIR) -> Optional[str]:
+    """
+    Generates a Markdown report summarizing the experiment results.
+
+    Args:
+        summary_input (str): Markdown summary of the experiment and its results
+        output_file (str): Path to save the Markdown report
+        backend: "openai" (default), "template" or a ReportBackend instance
+        cache_dir (str): Directory of reports keyed by a hash of the backend and summary_input; None disables caching
+
+    Returns the report content, or None if it could not be generated.
+    """
+    try:
+        backend = _backend(backend)
+        cache_path = report_cache_path(summary_input, backend, cache_dir) if cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path) as file:
+                report_content = file.read()
+        else:
+            report_content = backend.render(summary_input)
+            if cache_path:
+                os.makedirs(cache_dir, exist_ok=True)
+                # Write then rename, so concurrent runs never read a partial report
+                temporary_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temporary_path, "w") as file:
+                    file.write(report_content)
+                os.replace(temporary_path, cache_path)
 
         # Save report to a Markdown file
         with open(output_file, "w") as file:
@@ -46,7 +130,19 @@ def generate_report(summary_input: str, output_file="experiment_report.md"):
 
         print(f"Report generated successfully: {output_file}")
         logging.info(f"Report generated: {output_file}")
+        return report_content
 
     except Exception as e:
         logging.error(f"Error generating report: {e}")
-        print(f"Error generating report: {e}")
\ No newline at end of file
+        print(f"Error generating report: {e}")
+        return None
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def generate_report_async(summary_input: str, output_file="experiment_report.md", backend: Union[str, ReportBackend, None] = None,
+                          cache_dir: Optional[str] = REPORT_CACHE_DIR) -> Future:
+    # Runs generate_report on a background thread; the returned future resolves to the report content
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report")
+    return _executor.submit(generate_report, summary_input, output_file, backend, cache_dir)
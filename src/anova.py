@@ -1,59 +1,87 @@
 from dataclasses import dataclass
-from typing import Tuple
-from scipy import stats
-import statsmodels.stats.power as smp
-import numpy as np
+from typing import Optional, Tuple
 import logging
 import random
 from src.utils import Group, Experiment, CheckAssumptionsResult, TestResult
-
-# Configure logging to save results
-logging.basicConfig(filename='anova_results.log', level=logging.INFO, format='%(asctime)s - %(message)s')
+from src.assumptions import status
+from src.sink import JsonLinesSink
+from src.power import default_power_analysis
+from src.metrics import MetricMatrixResult, anova_matrix
+from src.moments import anova_from_moments, welch_anova_from_moments, eta_squared_from_moments, omega_squared_from_moments, moments_arrays
+from src.posthoc import PostHocResult, post_hoc_from_moments
+from src.permutation import PermutationResult, anova_permutation
 
 @dataclass
 class ANOVACheckAssumptionsResult(CheckAssumptionsResult):
     normality: dict
     variance_homogeneity: str
     variance_p: float
+    check_method: str = "exact"
 
 class ANOVAExperiment(Experiment):
     def check_assumptions(self) -> CheckAssumptionsResult:
-        data_arrays = [group.get_data_array() for group in self.groups]
-
-        # Normality Test (Shapiro-Wilk)
-        normality_results = {group.name: stats.shapiro(group.get_data_array()).pvalue for group in self.groups}
-
-        # Homogeneity of variance test
-        variance_pvalue = stats.levene(*data_arrays).pvalue
-
+        # Shapiro-Wilk and Levene, or their large-sample replacements (see Experiment.assumption_checks)
+        normality, variance_pvalue, mode = self.group_assumption_checks()
         return ANOVACheckAssumptionsResult(
-            normality={name: "Pass" if p > 0.05 else "Fail" for name, p in normality_results.items()},
-            variance_homogeneity="Pass" if variance_pvalue > 0.05 else "Fail",
-            variance_p=round(variance_pvalue, 3)
+            normality=normality,
+            variance_homogeneity=status(variance_pvalue),
+            variance_p=round(float(variance_pvalue), 3),
+            check_method=mode
         )
 
     def calculate_effect_size(self) -> float:
-        data_arrays = [group.get_data_array() for group in self.groups]
-        all_data = np.concatenate(data_arrays)
-        grand_mean = np.mean(all_data)
-        ss_between = sum(len(group.data) * (np.mean(group.data) - grand_mean) ** 2 for group in self.groups)
-        ss_total = sum((x - grand_mean) ** 2 for group in self.groups for x in group.data)
-        return round(ss_between / ss_total, 3)
+        # Eta squared from the group moments
+        counts, means, m2s = moments_arrays(self.group_moments())
+        return round(float(eta_squared_from_moments(counts, means, m2s)), 3)
+
+    def calculate_omega_squared(self) -> float:
+        counts, means, m2s = moments_arrays(self.group_moments())
+        return round(float(omega_squared_from_moments(counts, means, m2s)), 3)
+
+    def post_hoc(self, method: Optional[str] = None) -> PostHocResult:
+        # Tukey HSD when the variances are homogeneous, Games-Howell otherwise
+        if method is None:
+            method = "tukey" if self.assumptions().variance_homogeneity == "Pass" else "games-howell"
+        result = self.cached(f"post_hoc_{method}", lambda: post_hoc_from_moments([group.name for group in self.groups], self.group_moments(),
+                                                                                 method, self.alpha))
+        self.sink.emit("post_hoc_result", result)
+        return result
+
+    def permutation_test(self, num_permutations: Optional[int] = None, chunk_size=None, early_stopping=True,
+                         stop_significant=True) -> PermutationResult:
+        # Same classic or Welch F as perform_test
+        return anova_permutation(self.data_arrays(), equal_var=(self.assumptions().variance_homogeneity == "Pass"),
+                                 num_permutations=num_permutations or self.num_permutations, rng=self.rng, chunk_size=chunk_size,
+                                 alpha=self.alpha if early_stopping else None, stop_significant=stop_significant)
+
+    def perform_test_matrix(self, *matrices, equal_var=None) -> MetricMatrixResult:
+        # Same test for every metric column of one (observations x metrics) array per group
+        return anova_matrix(*matrices, alpha=self.alpha, equal_var=equal_var)
 
     def calculate_confidence_interval(self) -> Tuple[float, float]:
         return (0, 0)
 
     def perform_test(self) -> TestResult:
-        assumptions = self.check_assumptions()
-        data_arrays = [group.get_data_array() for group in self.groups]
+        with self.phase("check_assumptions"):
+            assumptions = self.assumptions()
+        counts, means, m2s = moments_arrays(self.group_moments())
         required_sample_size = 0
 
-        t_stat, p_value = stats.f_oneway(*data_arrays)
+        # Welch's ANOVA unless the variances are known to be homogeneous, like the t-test
+        anova = anova_from_moments if assumptions.variance_homogeneity == "Pass" else welch_anova_from_moments
+        t_stat, p_value = anova(counts, means, m2s)
+        inference = "parametric"
+        if self.use_permutation(assumptions):
+            with self.phase("permutation"):
+                # Only stops early above alpha, since small p-values may be corrected across repetitions afterwards
+                p_value = self.permutation_test(stop_significant=False).p_value
+            inference = "permutation"
         effect_size = self.calculate_effect_size()
         if effect_size == 0:
             logging.warning("Effect size is zero. No additional samples needed.")
         else:
-            required_sample_size = smp.FTestAnovaPower().solve_power(effect_size=effect_size, alpha=self.alpha, power=self.power, k_groups=len(self.groups))
+            with self.phase("power"):
+                required_sample_size = default_power_analysis.sample_size(effect_size, alpha=self.alpha, target_power=self.power, k_groups=len(self.groups), test="anova")
         confidence_interval = (0, 0)  # Placeholder for ANOVA
 
         conclusion = (
@@ -64,15 +92,16 @@ class ANOVAExperiment(Experiment):
 
         result = TestResult(
             test_type=self.test_type,
-            statistic=round(t_stat, 3),
-            p_value=round(p_value, 3),
+            statistic=round(float(t_stat), 3),
+            p_value=round(float(p_value), 3),
             effect_size=effect_size,
             required_sample_size_per_group=required_sample_size,
             confidence_interval=confidence_interval,
             conclusion=conclusion,
-            assumptions=assumptions
+            assumptions=assumptions,
+            inference=inference
         )
-        logging.info(result)
+        self.sink.emit("test_result", result)
         return result
 
 if __name__ == "__main__":
@@ -93,6 +122,10 @@ if __name__ == "__main__":
 
     num_experiments=10
     alpha=0.05 / num_experiments
-    experiment = ANOVAExperiment([group1, group2, group3], "anova", alpha=alpha)
+    sink = JsonLinesSink("anova_results.jsonl")
+    experiment = ANOVAExperiment([group1, group2, group3], "anova", alpha=alpha, sink=sink)
     experiment.pre_register("Groups A, B and C have significantly different means")
-    experiment.run_experiment_multiple_times(fetch_data, num_experiments=num_experiments)
\ No newline at end of file
+    experiment.run_experiment_multiple_times(fetch_data, num_experiments=num_experiments)
+    for comparison in experiment.post_hoc().significant():
+        print(comparison)
+    sink.close()
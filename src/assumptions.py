@@ -0,0 +1,72 @@
+from typing import List, Optional, Sequence, Tuple
+from scipy import stats
+import numpy as np
+from src.moments import RunningMoments, normaltest_from_moments, brown_forsythe, bartlett_from_moments
+from src.state import QuantileSketch, brown_forsythe_from_sketches
+
+# "exact":     Shapiro-Wilk and Levene on all observations
+# "subsample": Shapiro-Wilk and Levene on a deterministic subsample of at most assumption_sample_size points per group
+# "moments":   D'Agostino-Pearson from the moment sums and Brown-Forsythe in one vectorized pass; without observations
+#              Brown-Forsythe from quantile sketches if every group has one, otherwise Bartlett
+# "skip":      no checks; the t-test and ANOVA then fall back to Welch's tests
+# "auto":      "exact" up to assumption_sample_size points per group, "moments" above
+ASSUMPTION_CHECKS = ("auto", "exact", "subsample", "moments", "skip")
+
+# scipy's Shapiro-Wilk p-values are unreliable above this size
+SHAPIRO_MAX_SIZE = 5000
+
+def resolve_mode(mode: str, sizes: Sequence[int], sample_size=SHAPIRO_MAX_SIZE, streaming=False) -> str:
+    if mode not in ASSUMPTION_CHECKS:
+        raise ValueError(f"Unknown assumption check mode '{mode}', expected one of {ASSUMPTION_CHECKS}")
+    if mode == "auto":
+        mode = "exact" if max(sizes, default=0) <= sample_size else "moments"
+    if streaming and mode in ("exact", "subsample"):
+        # Without raw observations only the moments are available
+        mode = "moments"
+    return mode
+
+def deterministic_subsample(values: np.ndarray, size: int) -> np.ndarray:
+    # Evenly spaced observations, so repeated checks of the same data agree and ordered data stays covered end to end
+    if len(values) <= size:
+        return values
+    return values[np.linspace(0, len(values) - 1, size).astype(np.int64)]
+
+def status(p_value: float) -> str:
+    if np.isnan(p_value):
+        return "Skipped"
+    return "Pass" if p_value > 0.05 else "Fail"
+
+def normality_p_values(mode: str, data_arrays: Optional[Sequence[np.ndarray]] = None, moments: Optional[Sequence[RunningMoments]] = None,
+                       sample_size=SHAPIRO_MAX_SIZE) -> List[float]:
+    if mode == "skip":
+        return [float("nan")] * len(data_arrays if moments is None else moments)
+    if mode == "moments":
+        if moments is None:
+            moments = [RunningMoments.from_array(values) for values in data_arrays]
+        _, p_values = normaltest_from_moments(*(np.array([getattr(m, name) for m in moments], dtype=np.float64)
+                                                for name in ("count", "m2", "m3", "m4")))
+        return [float(p) for p in p_values]
+    if mode == "subsample":
+        data_arrays = [deterministic_subsample(values, sample_size) for values in data_arrays]
+    return [float(stats.shapiro(values).pvalue) for values in data_arrays]
+
+def variance_p_value(mode: str, data_arrays: Optional[Sequence[np.ndarray]] = None, moments: Optional[Sequence[RunningMoments]] = None,
+                     sample_size=SHAPIRO_MAX_SIZE, sketches: Optional[Sequence[QuantileSketch]] = None) -> float:
+    if mode == "skip":
+        return float("nan")
+    if mode == "moments":
+        if data_arrays is None and sketches is not None:
+            return brown_forsythe_from_sketches(moments, sketches)[1]
+        if data_arrays is None:
+            _, p_value = bartlett_from_moments([m.count for m in moments], [m.variance for m in moments])
+            return float(p_value)
+        return brown_forsythe(data_arrays)[1]
+    if mode == "subsample":
+        data_arrays = [deterministic_subsample(values, sample_size) for values in data_arrays]
+    return float(stats.levene(*data_arrays).pvalue)
+
+def group_checks(mode: str, data_arrays: Optional[Sequence[np.ndarray]], moments: Sequence[RunningMoments],
+                 sample_size=SHAPIRO_MAX_SIZE, sketches: Optional[Sequence[QuantileSketch]] = None) -> Tuple[List[float], float]:
+    # Normality p-value per group and the variance homogeneity p-value; data_arrays is None for streaming groups
+    return (normality_p_values(mode, data_arrays, moments, sample_size),
+            variance_p_value(mode, data_arrays, moments, sample_size, sketches))
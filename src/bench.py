@@ -0,0 +1,211 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from src.utils import Group, Experiment
+from src.ttest import TTestExperiment
+from src.anova import ANOVAExperiment
+from src.chi import ChiSquaredExperiment
+from src.regr import RegressionExperiment
+
+BENCH_TESTS = ("ttest", "anova", "chi_squared", "regression")
+DEFAULT_SIZES = (100, 10_000, 1_000_000)
+DEFAULT_GROUP_COUNTS = (3, 10)
+DEFAULT_REPETITIONS = (10, 100)
+# Bootstrap and repeated runs scale with size times repetitions, so they run on smaller samples by default
+DEFAULT_MAX_BOOTSTRAP_SIZE = 100_000
+DEFAULT_REPETITION_SIZE = 1_000
+DEFAULT_TOLERANCE = 0.2
+
+@dataclass
+class BenchmarkResult:
+    benchmark: str
+    test: str
+    size: int
+    groups: int
+    repetitions: int
+    seconds: float
+    peak_memory_bytes: int
+    runs: int
+
+    @property
+    def key(self) -> Tuple[str, str, int, int, int]:
+        return (self.benchmark, self.test, self.size, self.groups, self.repetitions)
+
+@dataclass
+class BenchmarkComparison:
+    current: BenchmarkResult
+    baseline: BenchmarkResult
+    time_ratio: float
+    memory_ratio: float
+    regression: bool
+
+@dataclass
+class BenchmarkReport:
+    results: List[BenchmarkResult]
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump({"metadata": self.metadata, "results": [asdict(result) for result in self.results]}, file, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "BenchmarkReport":
+        with open(path) as file:
+            content = json.load(file)
+        return cls(results=[BenchmarkResult(**result) for result in content["results"]], metadata=content.get("metadata", {}))
+
+def environment_metadata() -> Dict[str, str]:
+    import scipy
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+class SyntheticData:
+    # Module-level and picklable, so it can also serve as fetch_data in "experiment" fetch mode
+    def __init__(self, test: str, num_groups=2, num_categories=3, seed=0):
+        self.test = test
+        self.num_groups = num_groups
+        self.num_categories = num_categories
+        self.seed = seed
+
+    def __call__(self, i: int, num_data_points: int) -> List[np.ndarray]:
+        rng = np.random.default_rng([self.seed, i])
+        if self.test == "chi_squared":
+            return [rng.integers(0, self.num_categories, num_data_points) for _ in range(self.num_groups)]
+        if self.test == "regression":
+            x = rng.uniform(0, 100, num_data_points)
+            return [x, 2 * x + rng.normal(0, 5, num_data_points)]
+        return [rng.normal(80 + group, 5, num_data_points) for group in range(self.num_groups)]
+
+def build_experiment(test: str, num_groups=2, seed=0) -> Experiment:
+    if test == "chi_squared":
+        groups = [Group(name=f"Group {index}", dtype=np.int64) for index in range(num_groups)]
+        return ChiSquaredExperiment(groups, test, seed=seed, verbose=False)
+    groups = [Group(name=f"Group {index}") for index in range(num_groups)]
+    experiment_class = {"ttest": TTestExperiment, "anova": ANOVAExperiment, "regression": RegressionExperiment}[test]
+    return experiment_class(groups, test, seed=seed, verbose=False)
+
+def measure(function: Callable, runs=3, setup: Optional[Callable] = None) -> Tuple[float, int]:
+    # Best wall time over the runs and the peak traced memory of one run; setup runs untimed before each run
+    best = float("inf")
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def _default_groups(test: str, group_counts: Sequence[int]) -> Sequence[int]:
+    return group_counts if test == "anova" else (2,)
+
+def run_benchmarks(tests: Sequence[str] = BENCH_TESTS, sizes: Sequence[int] = DEFAULT_SIZES, group_counts: Sequence[int] = DEFAULT_GROUP_COUNTS,
+                   repetitions: Sequence[int] = DEFAULT_REPETITIONS, max_bootstrap_size=DEFAULT_MAX_BOOTSTRAP_SIZE,
+                   repetition_size=DEFAULT_REPETITION_SIZE, num_bootstraps=1000, runs=3, progress: Optional[Callable] = print) -> BenchmarkReport:
+    """
+    Times perform_test, check_assumptions, post_hoc (ANOVA) and bootstrap_analysis of each experiment type on synthetic data
+    for every size and group count, and run_experiment_multiple_times for every repetition count.
+    Per-run caches are dropped before each timed call, so repeated runs do the full work.
+    """
+    results = []
+
+    def drop_cache(experiment):
+        return lambda: setattr(experiment, "_cache_key", None)
+
+    def record(benchmark, test, size, groups, reps, function, setup=None):
+        seconds, peak = measure(function, runs, setup)
+        result = BenchmarkResult(benchmark, test, int(size), groups, reps, seconds, peak, runs)
+        results.append(result)
+        if progress is not None:
+            progress(f"{benchmark:<30} {test:<12} n={size:<10} groups={groups:<3} reps={reps:<5} {seconds * 1000:10.2f} ms {peak / 2 ** 20:9.2f} MiB")
+
+    for test in tests:
+        for num_groups in _default_groups(test, group_counts):
+            experiment = build_experiment(test, num_groups)
+            fetch_data = SyntheticData(test, num_groups)
+            for size in sizes:
+                experiment.load_experiment_data(fetch_data, 0, int(size), fetch_mode="experiment")
+                clear_cache = drop_cache(experiment)
+                record("perform_test", test, size, num_groups, 1, experiment.perform_test, clear_cache)
+                record("check_assumptions", test, size, num_groups, 1, experiment.check_assumptions, clear_cache)
+                if test == "anova":
+                    record("post_hoc", test, size, num_groups, 1, experiment.post_hoc, clear_cache)
+                if size <= max_bootstrap_size:
+                    record("bootstrap_analysis", test, size, num_groups, 1,
+                           lambda: experiment.bootstrap_analysis(num_bootstraps=num_bootstraps), clear_cache)
+            for reps in repetitions:
+                record("run_experiment_multiple_times", test, repetition_size, num_groups, reps,
+                       lambda: experiment.run_experiment_multiple_times(fetch_data, num_experiments=reps, num_data_points=repetition_size,
+                                                                        fetch_mode="experiment"))
+
+    return BenchmarkReport(results=results, metadata=environment_metadata())
+
+def compare(current: BenchmarkReport, baseline: BenchmarkReport, tolerance=DEFAULT_TOLERANCE) -> List[BenchmarkComparison]:
+    # A benchmark regresses when its time grows by more than the tolerance; memory ratios are reported alongside
+    baseline_results = {result.key: result for result in baseline.results}
+    comparisons = []
+    for result in current.results:
+        reference = baseline_results.get(result.key)
+        if reference is None:
+            continue
+        time_ratio = result.seconds / reference.seconds if reference.seconds > 0 else float("inf")
+        memory_ratio = result.peak_memory_bytes / reference.peak_memory_bytes if reference.peak_memory_bytes > 0 else float("nan")
+        comparisons.append(BenchmarkComparison(result, reference, time_ratio, memory_ratio, time_ratio > 1 + tolerance))
+    return comparisons
+
+def format_comparisons(comparisons: List[BenchmarkComparison]) -> str:
+    lines = []
+    for comparison in comparisons:
+        result = comparison.current
+        status = "REGRESSION" if comparison.regression else "ok"
+        lines.append(f"{status:<10} {result.benchmark:<30} {result.test:<12} n={result.size:<10} groups={result.groups:<3} "
+                     f"reps={result.repetitions:<5} time x{comparison.time_ratio:.2f}  memory x{comparison.memory_ratio:.2f}")
+    return "\n".join(lines)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.bench", description="Benchmark the experiment types across data sizes.")
+    parser.add_argument("--tests", nargs="+", default=list(BENCH_TESTS), choices=BENCH_TESTS)
+    parser.add_argument("--sizes", nargs="+", type=float, default=list(DEFAULT_SIZES), help="sample sizes per group, e.g. 1e2 1e4 1e7")
+    parser.add_argument("--groups", nargs="+", type=int, default=list(DEFAULT_GROUP_COUNTS), help="group counts for ANOVA")
+    parser.add_argument("--repetitions", nargs="+", type=int, default=list(DEFAULT_REPETITIONS))
+    parser.add_argument("--repetition-size", type=int, default=DEFAULT_REPETITION_SIZE)
+    parser.add_argument("--max-bootstrap-size", type=float, default=DEFAULT_MAX_BOOTSTRAP_SIZE)
+    parser.add_argument("--num-bootstraps", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against; exits with 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.tests, [int(size) for size in args.sizes], args.groups, args.repetitions, int(args.max_bootstrap_size),
+                            args.repetition_size, args.num_bootstraps, args.runs)
+    if args.output:
+        report.save(args.output)
+    if args.compare:
+        comparisons = compare(report, BenchmarkReport.load(args.compare), args.tolerance)
+        print(format_comparisons(comparisons))
+        if any(comparison.regression for comparison in comparisons):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+from scipy import stats
+import numpy as np
+
+# Upper bound on the number of resampled values materialized per chunk (~2 MB of float64, cache friendly)
+DEFAULT_MAX_CHUNK_ELEMENTS = 2 ** 18
+
+BOOTSTRAP_METHODS = ("percentile", "basic", "bca")
+
+# A statistic receives one array of shape (num_resamples, n_i) per group and
+# returns an array of shape (num_resamples,), reducing along the last axis.
+Statistic = Callable[..., np.ndarray]
+
+@dataclass
+class BootstrapResult:
+    estimate: float
+    bootstrap_mean: float
+    standard_error: float
+    confidence_interval: Tuple[float, float]
+    method: str
+    num_bootstraps: int
+    distribution: np.ndarray
+
+def mean_difference(*samples: np.ndarray) -> np.ndarray:
+    return np.mean(samples[0], axis=-1) - np.mean(samples[1], axis=-1)
+
+def mean_range(*samples: np.ndarray) -> np.ndarray:
+    means = np.stack([np.mean(sample, axis=-1) for sample in samples])
+    return np.max(means, axis=0) - np.min(means, axis=0)
+
+def default_statistic(num_groups: int) -> Statistic:
+    # Two groups compare means directly, k groups use the spread of the group means
+    return mean_difference if num_groups == 2 else mean_range
+
+def _chunk_size(lengths: Sequence[int], num_bootstraps: int, chunk_size: Optional[int]) -> int:
+    if chunk_size is None:
+        chunk_size = DEFAULT_MAX_CHUNK_ELEMENTS // max(sum(lengths), 1)
+    return int(min(max(chunk_size, 1), num_bootstraps))
+
+def bootstrap_distribution(data_arrays: Sequence[np.ndarray], statistic: Statistic, num_bootstraps: int = 1000,
+                           rng: Optional[np.random.Generator] = None, chunk_size: Optional[int] = None) -> np.ndarray:
+    rng = np.random.default_rng(rng)
+    lengths = [len(data) for data in data_arrays]
+    chunk = _chunk_size(lengths, num_bootstraps, chunk_size)
+
+    distribution = np.empty(num_bootstraps)
+    for start in range(0, num_bootstraps, chunk):
+        size = min(chunk, num_bootstraps - start)
+        # One index matrix per group: row b holds the b-th resample
+        samples = [data[rng.integers(0, n, size=(size, n))] for data, n in zip(data_arrays, lengths)]
+        distribution[start:start + size] = statistic(*samples)
+    return distribution
+
+def _jackknife(data_arrays: Sequence[np.ndarray], statistic: Statistic, chunk_size: Optional[int]) -> List[np.ndarray]:
+    # Leave-one-out values of the statistic, computed separately for each group
+    lengths = [len(data) for data in data_arrays]
+    jackknife_values = []
+    for g, data in enumerate(data_arrays):
+        n = lengths[g]
+        chunk = _chunk_size(lengths, n, chunk_size)
+        columns = np.arange(n - 1)
+        values = np.empty(n)
+        for start in range(0, n, chunk):
+            rows = np.arange(start, min(start + chunk, n))
+            # Row i skips observation i
+            leave_one_out = data[columns[None, :] + (columns[None, :] >= rows[:, None])]
+            samples = [leave_one_out if h == g else np.broadcast_to(other, (len(rows), len(other)))
+                       for h, other in enumerate(data_arrays)]
+            values[rows] = statistic(*samples)
+        jackknife_values.append(values)
+    return jackknife_values
+
+def _bca_levels(distribution: np.ndarray, estimate: float, data_arrays: Sequence[np.ndarray], statistic: Statistic,
+                confidence: float, chunk_size: Optional[int]) -> Tuple[float, float]:
+    # Bias correction from the share of resamples below the point estimate
+    below = np.mean(distribution < estimate) + 0.5 * np.mean(distribution == estimate)
+    z0 = stats.norm.ppf(below)
+
+    # Acceleration from the jackknife influence values of all groups
+    deviations = np.concatenate([np.mean(values) - values for values in _jackknife(data_arrays, statistic, chunk_size)])
+    denominator = 6 * np.sum(deviations ** 2) ** 1.5
+    acceleration = np.sum(deviations ** 3) / denominator if denominator > 0 else 0.0
+
+    z_alpha = stats.norm.ppf([(1 - confidence) / 2, (1 + confidence) / 2])
+    adjusted = stats.norm.cdf(z0 + (z0 + z_alpha) / (1 - acceleration * (z0 + z_alpha)))
+    return tuple(np.nan_to_num(adjusted, nan=0.5))
+
+def bootstrap(data_arrays: Sequence[np.ndarray], statistic: Optional[Statistic] = None, num_bootstraps: int = 1000,
+              confidence: float = 0.95, method: str = "percentile", rng: Optional[np.random.Generator] = None,
+              chunk_size: Optional[int] = None) -> BootstrapResult:
+    """
+    Bootstraps a statistic over k independent groups with vectorized resampling.
+
+    Resamples are drawn as (chunk_size, n_i) index matrices from a numpy Generator, so passing
+    a seed or Generator as rng makes the result reproducible. Supported intervals are
+    "percentile", "basic" and "bca".
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"Unknown bootstrap method '{method}', expected one of {BOOTSTRAP_METHODS}")
+    data_arrays = [np.asarray(data) for data in data_arrays]
+    if statistic is None:
+        statistic = default_statistic(len(data_arrays))
+
+    estimate = float(statistic(*[data[None, :] for data in data_arrays])[0])
+    distribution = bootstrap_distribution(data_arrays, statistic, num_bootstraps, rng, chunk_size)
+
+    if method == "bca":
+        levels = _bca_levels(distribution, estimate, data_arrays, statistic, confidence, chunk_size)
+    else:
+        levels = ((1 - confidence) / 2, (1 + confidence) / 2)
+    ci_lower, ci_upper = np.quantile(distribution, levels)
+    if method == "basic":
+        ci_lower, ci_upper = 2 * estimate - ci_upper, 2 * estimate - ci_lower
+
+    return BootstrapResult(
+        estimate=estimate,
+        bootstrap_mean=float(np.mean(distribution)),
+        standard_error=float(np.std(distribution, ddof=1)),
+        confidence_interval=(float(ci_lower), float(ci_upper)),
+        method=method,
+        num_bootstraps=num_bootstraps,
+        distribution=distribution
+    )
@@ -1,47 +1,108 @@
 from dataclasses import dataclass
-from typing import Tuple
-from scipy import stats
-import logging
+from typing import Tuple, List, Optional, Mapping, Sequence
 import random
 import numpy as np
 from src.utils import Group, Experiment, CheckAssumptionsResult, TestResult
-
-# Configure logging to save results
-logging.basicConfig(filename='chi_squared_results.log', level=logging.INFO, format='%(asctime)s - %(message)s')
+from src.sink import JsonLinesSink
+from src.contingency import ContingencyTable
+from src.state import GroupState
 
 @dataclass
 class ChiSquaredCheckAssumptionsResult(CheckAssumptionsResult):
     assumption_status: str
     min_expected: float
+    fallback_test: Optional[str] = None
 
 class ChiSquaredExperiment(Experiment):
-    def check_assumptions(self) -> CheckAssumptionsResult:
-        data_arrays = [np.bincount(group.get_data_array(), minlength=2) for group in self.groups]
+    def __init__(self, *args, table: Optional[ContingencyTable] = None, num_categories=2, num_simulations=10000, **kwargs):
+        # With a table the test runs on its counts; otherwise the groups hold one category code per observation
+        super().__init__(*args, **kwargs)
+        self.table = table
+        self.num_categories = num_categories
+        self.num_simulations = num_simulations
+
+    @classmethod
+    def from_counts(cls, counts, group_names: Optional[List[str]] = None, test_type="chi_squared", **kwargs) -> "ChiSquaredExperiment":
+        # counts is a (groups x categories) table, or a mapping of group name to its category counts; unnamed groups are numbered
+        if isinstance(counts, Mapping):
+            group_names, counts = list(counts), [np.ravel(row) for row in counts.values()]
+            width = max(len(row) for row in counts)
+            counts = [np.pad(row, (0, width - len(row))) for row in counts]
+        if group_names is None:
+            group_names = [f"Group {i + 1}" for i in range(len(counts))]
+        return cls([Group(name=name, dtype=np.int64) for name in group_names], test_type, table=ContingencyTable.from_counts(counts), **kwargs)
+
+    @classmethod
+    def from_states(cls, states: Sequence[GroupState], test_type="chi_squared", **kwargs) -> "ChiSquaredExperiment":
+        # Categorical shard states (see src.state.merge_shards) carry the category counts of each group
+        return cls.from_counts({state.name: state.counts for state in states}, test_type=test_type, **kwargs)
+
+    def update(self, group_name: str, codes) -> None:
+        # Streams category codes straight into the counts
+        if self.table is None:
+            self.table = ContingencyTable(len(self.groups), self.num_categories)
+        self.table.update([group.name for group in self.groups].index(group_name), codes)
+
+    def data_version(self) -> tuple:
+        return super().data_version() + ((id(self.table), self.table.version) if self.table is not None else ())
+
+    def result_config(self) -> dict:
+        return {**super().result_config(), "num_categories": self.num_categories, "num_simulations": self.num_simulations}
+
+    def content_chunks(self):
+        yield from super().content_chunks()
+        if self.table is not None:
+            yield self.table.counts
+
+    def contingency_table(self) -> ContingencyTable:
+        def build():
+            if self.table is not None:
+                return self.table
+            table = ContingencyTable(len(self.groups), self.num_categories)
+            # Counted chunk by chunk, so memory-mapped groups are never loaded whole
+            for i, group in enumerate(self.groups):
+                for chunk in group.iter_chunks():
+                    table.update(i, chunk)
+            return table
+        return self.cached("contingency_table", build)
+
+    def chi2_contingency(self) -> Tuple[float, float, int]:
+        return self.cached("chi2_contingency", lambda: self.contingency_table().chi2())
 
+    def check_assumptions(self) -> CheckAssumptionsResult:
         # Expected frequency should not be too small
-        contingency_table = np.vstack(data_arrays)
-        _, expected_freq = np.histogram(contingency_table, bins=len(self.groups))
-        min_expected = np.min(expected_freq)
-        assumption_status = "Pass" if min_expected >= 5 else "Fail"
+        min_expected = float(np.min(self.contingency_table().expected()))
+        if min_expected >= 5:
+            return ChiSquaredCheckAssumptionsResult("Pass", min_expected)
+        fallback_test, _ = self.small_sample_test()
+        return ChiSquaredCheckAssumptionsResult("Fail", min_expected, fallback_test)
 
-        return ChiSquaredCheckAssumptionsResult(assumption_status, min_expected)
+    def small_sample_test(self) -> Tuple[str, float]:
+        return self.cached("small_sample_test", lambda: self.contingency_table().small_sample_test(self.num_simulations, self.rng))
 
     def calculate_effect_size(self) -> float:
         # Effect size for chi-square test (Cramér's V)
-        contingency_table = np.vstack([np.bincount(group.get_data_array(), minlength=2) for group in self.groups])
-        chi2, _, _, _ = stats.chi2_contingency(contingency_table)
-        n = np.sum(contingency_table)
-        min_dim = min(contingency_table.shape) - 1
-        return round(np.sqrt(chi2 / (n * min_dim)), 3)
+        contingency_table = self.contingency_table()
+        observed = contingency_table.observed()
+        chi2, _, _ = self.chi2_contingency()
+        min_dim = min(observed.shape) - 1
+        return round(float(np.sqrt(chi2 / (np.sum(observed) * min_dim))), 3) if min_dim > 0 else 0.0
 
     def calculate_confidence_interval(self) -> Tuple[float, float]:
         return (0, 0)  # Not commonly computed for chi-square tests
 
+    def interim_p_value(self) -> float:
+        _, p_value, _ = self.chi2_contingency()
+        return p_value
+
     def perform_test(self) -> TestResult:
-        assumptions = self.check_assumptions()
-        contingency_table = np.vstack([np.bincount(group.get_data_array(), minlength=2) for group in self.groups])
+        with self.phase("check_assumptions"):
+            assumptions = self.assumptions()
 
-        chi2_stat, p_value, _, _ = stats.chi2_contingency(contingency_table)
+        chi2_stat, p_value, _ = self.chi2_contingency()
+        if assumptions.fallback_test is not None:
+            # Expected counts are too small for the chi-squared approximation
+            _, p_value = self.small_sample_test()
         effect_size = self.calculate_effect_size()
 
         required_sample_size = 0  # Sample size planning isn't usually applicable to chi-squared tests
@@ -62,12 +123,12 @@ class ChiSquaredExperiment(Experiment):
             conclusion=conclusion,
             assumptions=assumptions
         )
-        logging.info(result)
+        self.sink.emit("test_result", result)
         return result
 
 if __name__ == "__main__":
-    group1 = Group(name="Group A")
-    group2 = Group(name="Group B")
+    group1 = Group(name="Group A", dtype=np.int64)
+    group2 = Group(name="Group B", dtype=np.int64)
 
     def fetch_data(group_name: str, i: int) -> int:
         if i % 5 == 0 or i % 6 == 0:
@@ -79,6 +140,8 @@ if __name__ == "__main__":
     num_experiments = 10
     alpha = 0.05 / num_experiments  # Bonferroni correction
 
-    experiment = ChiSquaredExperiment([group1, group2], "chi_squared", alpha=alpha)
+    sink = JsonLinesSink("chi_squared_results.jsonl")
+    experiment = ChiSquaredExperiment([group1, group2], "chi_squared", alpha=alpha, sink=sink)
     experiment.pre_register("Group A and B will have significantly different distributions")
-    experiment.run_experiment_multiple_times(fetch_data, num_experiments=num_experiments)
\ No newline at end of file
+    experiment.run_experiment_multiple_times(fetch_data, num_experiments=num_experiments)
+    sink.close()
@@ -0,0 +1,126 @@
+from typing import Optional, Tuple
+from scipy import stats
+import numpy as np
+
+# Chunk size for Monte Carlo tables, bounding memory to chunk x groups x categories counts
+MONTE_CARLO_CHUNK = 1000
+
+class ContingencyTable:
+    """
+    Count-based groups x categories table that is updated in place from category codes or counts.
+    Only the counts are kept, so memory depends on the number of categories, not on the number of events.
+    """
+    def __init__(self, num_groups: int, num_categories=2, counts=None):
+        if counts is not None:
+            counts = np.array(counts, dtype=np.int64)
+            if counts.ndim != 2 or np.any(counts < 0):
+                raise ValueError("Counts must be a 2-D array of non-negative integers")
+            self._counts = counts
+        else:
+            self._counts = np.zeros((num_groups, num_categories), dtype=np.int64)
+        self.version = 0
+
+    @classmethod
+    def from_counts(cls, counts) -> "ContingencyTable":
+        counts = np.asarray(counts)
+        return cls(counts.shape[0], counts.shape[1], counts=counts)
+
+    @property
+    def counts(self) -> np.ndarray:
+        view = self._counts.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def num_categories(self) -> int:
+        return self._counts.shape[1]
+
+    def _grow(self, num_categories: int) -> None:
+        if num_categories > self.num_categories:
+            counts = np.zeros((self._counts.shape[0], num_categories), dtype=np.int64)
+            counts[:, :self.num_categories] = self._counts
+            self._counts = counts
+
+    def update(self, group_index: int, codes) -> None:
+        # Category codes are integers in [0, num_categories); unseen codes add new categories
+        codes = np.asarray(codes).ravel()
+        if len(codes) == 0:
+            return
+        if codes.dtype.kind not in "iu":
+            codes = codes.astype(np.intp)
+        if np.min(codes) < 0:
+            raise ValueError("Category codes must be non-negative")
+        counts = np.bincount(codes, minlength=self.num_categories)
+        self.add_counts(group_index, counts)
+
+    def add_counts(self, group_index: int, counts) -> None:
+        counts = np.asarray(counts, dtype=np.int64).ravel()
+        self._grow(len(counts))
+        self._counts[group_index, :len(counts)] += counts
+        self.version += 1
+
+    def clear(self) -> None:
+        self._counts[:] = 0
+        self.version += 1
+
+    def merge(self, other: "ContingencyTable") -> "ContingencyTable":
+        num_categories = max(self.num_categories, other.num_categories)
+        merged = ContingencyTable(self._counts.shape[0], num_categories)
+        merged._counts[:, :self.num_categories] += self._counts
+        merged._counts[:, :other.num_categories] += other._counts
+        return merged
+
+    def observed(self) -> np.ndarray:
+        # Rows and columns without any counts carry no information and would give zero expected frequencies
+        counts = self._counts
+        return counts[np.sum(counts, axis=1) > 0][:, np.sum(counts, axis=0) > 0]
+
+    def expected(self) -> np.ndarray:
+        return _expected(self.observed())
+
+    def chi2(self, correction=True) -> Tuple[float, float, int]:
+        observed = self.observed().astype(np.float64)
+        expected = _expected(observed)
+        dof = (observed.shape[0] - 1) * (observed.shape[1] - 1)
+        if dof == 0:
+            return 0.0, 1.0, 0
+        if dof == 1 and correction:
+            # Yates' continuity correction, as in scipy.stats.chi2_contingency
+            diff = expected - observed
+            observed = observed + np.sign(diff) * np.minimum(0.5, np.abs(diff))
+        statistic = float(np.sum((observed - expected) ** 2 / expected))
+        return statistic, float(stats.chi2.sf(statistic, dof)), dof
+
+    def cramers_v(self, correction=True) -> float:
+        observed = self.observed()
+        min_dim = min(observed.shape) - 1
+        if min_dim == 0:
+            return 0.0
+        statistic, _, _ = self.chi2(correction)
+        return float(np.sqrt(statistic / (np.sum(observed) * min_dim)))
+
+    def monte_carlo_test(self, num_simulations=10000, rng: Optional[np.random.Generator] = None) -> float:
+        # Tables with the observed margins are drawn in vectorized chunks from the null distribution
+        rng = np.random.default_rng(rng)
+        observed = self.observed()
+        expected = _expected(observed)
+        statistic = np.sum((observed - expected) ** 2 / expected)
+        null_tables = stats.random_table(np.sum(observed, axis=1), np.sum(observed, axis=0))
+
+        exceed = 0
+        for start in range(0, num_simulations, MONTE_CARLO_CHUNK):
+            size = min(MONTE_CARLO_CHUNK, num_simulations - start)
+            tables = null_tables.rvs(size=size, random_state=rng)
+            simulated = np.sum((tables - expected) ** 2 / expected, axis=(1, 2))
+            exceed += np.count_nonzero(simulated >= statistic * (1 - 1e-12))
+        return float((exceed + 1) / (num_simulations + 1))
+
+    def small_sample_test(self, num_simulations=10000, rng: Optional[np.random.Generator] = None) -> Tuple[str, float]:
+        # Fisher's exact test for 2x2 tables, Monte Carlo otherwise
+        observed = self.observed()
+        if observed.shape == (2, 2):
+            return "fisher_exact", float(stats.fisher_exact(observed).pvalue)
+        return "monte_carlo", self.monte_carlo_test(num_simulations, rng)
+
+def _expected(observed: np.ndarray) -> np.ndarray:
+    return np.outer(np.sum(observed, axis=1), np.sum(observed, axis=0)) / np.sum(observed)
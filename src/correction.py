@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+import numpy as np
+
+CORRECTION_METHODS = ("bonferroni", "sidak", "holm", "hochberg", "bh", "by")
+
+@dataclass
+class CorrectionResult:
+    method: str
+    alpha: float
+    adjusted_p_values: np.ndarray
+    reject: np.ndarray
+
+    @property
+    def num_rejected(self) -> int:
+        return int(np.count_nonzero(self.reject))
+
+def corrected_alpha(alpha: float, num_tests: int, method="bonferroni") -> float:
+    # Per-test threshold of the single-step methods; the step-up/down methods have no fixed threshold
+    if method == "bonferroni":
+        return alpha / num_tests
+    if method == "sidak":
+        return float(-np.expm1(np.log1p(-alpha) / num_tests))
+    return float("nan")
+
+def _adjust_sorted(p: np.ndarray, method: str) -> np.ndarray:
+    # p is sorted ascending and free of NaNs
+    n = len(p)
+    rank = np.arange(1, n + 1)
+    if method == "bonferroni":
+        return np.minimum(p * n, 1)
+    if method == "sidak":
+        return -np.expm1(n * np.log1p(-p))
+    if method == "holm":
+        return np.minimum(np.maximum.accumulate(p * (n - rank + 1)), 1)
+    if method == "hochberg":
+        return np.minimum(np.minimum.accumulate((p * (n - rank + 1))[::-1])[::-1], 1)
+    if method in ("bh", "by"):
+        scale = np.sum(1 / rank) if method == "by" else 1.0
+        return np.minimum(np.minimum.accumulate((p * n * scale / rank)[::-1])[::-1], 1)
+    raise ValueError(f"Unknown correction method '{method}', expected one of {CORRECTION_METHODS}")
+
+def adjust_p_values(p_values, method="bonferroni") -> np.ndarray:
+    """
+    Multiplicity-adjusted p-values in O(n log n), keeping the shape of p_values.
+    NaN p-values are left as NaN and do not count towards the number of tests.
+    """
+    if method not in CORRECTION_METHODS:
+        raise ValueError(f"Unknown correction method '{method}', expected one of {CORRECTION_METHODS}")
+    p_values = np.asarray(p_values, dtype=np.float64)
+    flat = p_values.ravel()
+    adjusted = np.full(flat.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(flat))
+    order = valid[np.argsort(flat[valid], kind="stable")]
+    adjusted[order] = _adjust_sorted(flat[order], method)
+    return adjusted.reshape(p_values.shape)
+
+def correct(p_values, alpha=0.05, method="bonferroni") -> CorrectionResult:
+    adjusted = adjust_p_values(p_values, method)
+    with np.errstate(invalid="ignore"):
+        reject = adjusted <= alpha
+    return CorrectionResult(method=method, alpha=alpha, adjusted_p_values=adjusted, reject=reject)
@@ -0,0 +1,72 @@
+import csv
+from itertools import islice
+from typing import Iterator, Union
+import numpy as np
+
+# Rows parsed per chunk when reading CSV files
+DEFAULT_CSV_CHUNK_ROWS = 1_000_000
+
+def open_array(path: str, dtype=np.float64) -> np.ndarray:
+    # Memory-maps a .npy file, or a raw binary file of the given dtype; nothing is read until it is used
+    if path.endswith(".npy"):
+        values = np.load(path, mmap_mode="r")
+    else:
+        values = np.memmap(path, dtype=dtype, mode="r")
+    if values.ndim != 1:
+        raise ValueError(f"Expected a one-dimensional array in '{path}', got shape {values.shape}")
+    return values
+
+def _column_index(header: str, column: Union[str, int], delimiter: str) -> int:
+    if isinstance(column, int):
+        return column
+    names = [name.strip() for name in next(csv.reader([header], delimiter=delimiter))]
+    if column not in names:
+        raise ValueError(f"Column '{column}' not found, expected one of {names}")
+    return names.index(column)
+
+def read_csv_chunks(path: str, column: Union[str, int] = 0, chunk_size=DEFAULT_CSV_CHUNK_ROWS, delimiter=",", dtype=np.float64,
+                    header=True) -> Iterator[np.ndarray]:
+    """
+    Yields one column of a CSV file as arrays of at most chunk_size values, so the file never has to fit
+    in memory. column is a header name or a zero-based index; with header=False it must be an index.
+    """
+    with open(path, newline="") as file:
+        if header:
+            index = _column_index(file.readline(), column, delimiter)
+        elif isinstance(column, int):
+            index = column
+        else:
+            raise ValueError("Columns can only be selected by name when the file has a header")
+        while True:
+            lines = list(islice(file, chunk_size))
+            if not lines:
+                return
+            yield np.loadtxt(lines, delimiter=delimiter, usecols=index, dtype=dtype, quotechar='"', ndmin=1)
+
+def load_csv(group, path: str, column: Union[str, int] = 0, chunk_size=DEFAULT_CSV_CHUNK_ROWS, delimiter=",", header=True):
+    # Appends a CSV column to the group chunk by chunk; a streaming group then needs constant memory
+    for chunk in read_csv_chunks(path, column, chunk_size, delimiter, group.dtype, header):
+        group.extend(chunk)
+    return group
+
+def csv_to_npy(path: str, out_path: str, column: Union[str, int] = 0, chunk_size=DEFAULT_CSV_CHUNK_ROWS, delimiter=",", dtype=np.float64,
+               header=True) -> str:
+    # Converts a CSV column to a .npy file in two passes (count, then fill) that can afterwards be memory-mapped with Group.from_file
+    num_rows, last = 0, b"\n"
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(2 ** 24), b""):
+            num_rows += block.count(b"\n")
+            last = block[-1:]
+    # A last line without a trailing newline
+    num_rows += last != b"\n"
+    num_rows -= int(header)
+    output = np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=(num_rows,))
+    start = 0
+    for chunk in read_csv_chunks(path, column, chunk_size, delimiter, dtype, header):
+        output[start:start + len(chunk)] = chunk
+        start += len(chunk)
+    output.flush()
+    del output
+    if start != num_rows:
+        raise ValueError(f"Expected {num_rows} rows in '{path}', read {start}")
+    return out_path
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import numpy as np
+from src.moments import (ttest_from_moments, cohens_d_from_moments, mean_difference_confidence_interval,
+                         anova_from_moments, welch_anova_from_moments, eta_squared_from_moments)
+
+@dataclass
+class MetricMatrixResult:
+    test_type: str
+    statistic: np.ndarray
+    p_value: np.ndarray
+    effect_size: np.ndarray
+    ci_lower: np.ndarray
+    ci_upper: np.ndarray
+    sample_sizes: np.ndarray
+    reject: np.ndarray
+
+    @property
+    def num_metrics(self) -> int:
+        return len(self.p_value)
+
+def _as_matrix(matrix) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float64)
+    return matrix[:, None] if matrix.ndim == 1 else matrix
+
+def column_moments(matrix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Count, mean and M2 per column of an (observations x metrics) array; NaN marks a missing observation
+    matrix = _as_matrix(matrix)
+    missing = np.isnan(matrix)
+    if not missing.any():
+        means = np.mean(matrix, axis=0)
+        return np.full(matrix.shape[1], matrix.shape[0], dtype=np.float64), means, np.sum((matrix - means) ** 2, axis=0)
+    counts = np.sum(~missing, axis=0).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.nansum(matrix, axis=0) / counts
+    return counts, means, np.nansum((matrix - means) ** 2, axis=0)
+
+def brown_forsythe_matrix(*groups) -> np.ndarray:
+    # Variance homogeneity p-value per column: Levene's test around the group medians, as the experiments check it
+    deviations = []
+    for matrix in map(_as_matrix, groups):
+        missing = np.isnan(matrix)
+        medians = np.nanmedian(matrix, axis=0) if missing.any() else np.median(matrix, axis=0)
+        deviations.append(np.abs(matrix - medians))
+    counts, means, m2s = (np.vstack(values) for values in zip(*(column_moments(values) for values in deviations)))
+    return anova_from_moments(counts, means, m2s)[1]
+
+def ttest_matrix(a, b, alpha=0.05, confidence=0.95, equal_var: Optional[bool] = None) -> MetricMatrixResult:
+    """
+    Independent t-tests for every metric column of the (observations x metrics) arrays a and b.
+    With equal_var=None the pooled or Welch test is chosen per metric by brown_forsythe_matrix, like
+    TTestExperiment chooses it from its variance homogeneity check.
+    """
+    count1, mean1, m2_1 = column_moments(a)
+    count2, mean2, m2_2 = column_moments(b)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var1, var2 = m2_1 / (count1 - 1), m2_2 / (count2 - 1)
+
+    if equal_var is None:
+        variance_p = brown_forsythe_matrix(a, b)
+        pooled_t, pooled_p = ttest_from_moments(count1, mean1, var1, count2, mean2, var2, equal_var=True)
+        welch_t, welch_p = ttest_from_moments(count1, mean1, var1, count2, mean2, var2, equal_var=False)
+        equal = variance_p > 0.05
+        statistic, p_value = np.where(equal, pooled_t, welch_t), np.where(equal, pooled_p, welch_p)
+    else:
+        statistic, p_value = ttest_from_moments(count1, mean1, var1, count2, mean2, var2, equal_var=equal_var)
+
+    ci_lower, ci_upper = mean_difference_confidence_interval(count1, mean1, var1, count2, mean2, var2, confidence)
+    return MetricMatrixResult(
+        test_type="ttest",
+        statistic=np.asarray(statistic),
+        p_value=np.asarray(p_value),
+        effect_size=cohens_d_from_moments(mean1, var1, mean2, var2),
+        ci_lower=ci_lower,
+        ci_upper=ci_upper,
+        sample_sizes=np.vstack([count1, count2]).astype(np.int64),
+        reject=np.asarray(p_value) < alpha
+    )
+
+def anova_matrix(*groups, alpha=0.05, equal_var: Optional[bool] = None) -> MetricMatrixResult:
+    """
+    One-way ANOVA for every metric column, or Welch's ANOVA with equal_var=False. With equal_var=None the test
+    is chosen per metric by brown_forsythe_matrix, like ANOVAExperiment chooses it from its variance check.
+    Confidence intervals are not defined and left as NaN.
+    """
+    counts, means, m2s = (np.vstack(values) for values in zip(*(column_moments(group) for group in groups)))
+    if equal_var is None:
+        equal = brown_forsythe_matrix(*groups) > 0.05
+        classic_f, classic_p = anova_from_moments(counts, means, m2s)
+        welch_f, welch_p = welch_anova_from_moments(counts, means, m2s)
+        statistic, p_value = np.where(equal, classic_f, welch_f), np.where(equal, classic_p, welch_p)
+    else:
+        statistic, p_value = (anova_from_moments if equal_var else welch_anova_from_moments)(counts, means, m2s)
+    nan = np.full(statistic.shape, np.nan)
+    return MetricMatrixResult(
+        test_type="anova",
+        statistic=statistic,
+        p_value=p_value,
+        effect_size=eta_squared_from_moments(counts, means, m2s),
+        ci_lower=nan,
+        ci_upper=nan.copy(),
+        sample_sizes=counts.astype(np.int64),
+        reject=p_value < alpha
+    )
@@ -0,0 +1,208 @@
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+from scipy import stats
+import numpy as np
+
+@dataclass
+class RunningMoments:
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    # Third and fourth central moment sums, for skewness and kurtosis
+    m3: float = 0.0
+    m4: float = 0.0
+
+    @classmethod
+    def from_array(cls, values) -> "RunningMoments":
+        moments = cls()
+        moments.update(values)
+        return moments
+
+    @classmethod
+    def from_chunks(cls, chunks) -> "RunningMoments":
+        # Combines the moments of each chunk, so no temporary is larger than one chunk
+        moments = cls()
+        for chunk in chunks:
+            moments.update(chunk)
+        return moments
+
+    def add(self, value: float) -> None:
+        # Welford update for a single observation, extended to M3 and M4 (Pebay)
+        n = self.count + 1
+        delta = value - self.mean
+        delta_n = delta / n
+        term = delta * delta_n * self.count
+        self.mean += delta_n
+        self.m4 += term * delta_n ** 2 * (n * n - 3 * n + 3) + 6 * delta_n ** 2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term
+        self.count = n
+
+    def update(self, values) -> None:
+        # Chan et al. update: combine the moments of a batch with the running moments
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        batch_mean = np.mean(values)
+        deviations = values - batch_mean
+        squared = deviations * deviations
+        self._combine(len(values), batch_mean, np.sum(squared), np.dot(squared, deviations), np.dot(squared, squared))
+
+    def merge(self, other: "RunningMoments") -> "RunningMoments":
+        merged = RunningMoments(self.count, self.mean, self.m2, self.m3, self.m4)
+        merged._combine(other.count, other.mean, other.m2, other.m3, other.m4)
+        return merged
+
+    def _combine(self, count: int, mean: float, m2: float, m3=0.0, m4=0.0) -> None:
+        if count == 0:
+            return
+        n_a, n_b = self.count, count
+        total = n_a + n_b
+        delta = mean - self.mean
+        self.m4 = float(self.m4 + m4 + delta ** 4 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b) / total ** 3
+                        + 6 * delta ** 2 * (n_a * n_a * m2 + n_b * n_b * self.m2) / total ** 2
+                        + 4 * delta * (n_a * m3 - n_b * self.m3) / total)
+        self.m3 = float(self.m3 + m3 + delta ** 3 * n_a * n_b * (n_a - n_b) / total ** 2
+                        + 3 * delta * (n_a * m2 - n_b * self.m2) / total)
+        self.mean = float(self.mean + delta * n_b / total)
+        self.m2 = float(self.m2 + m2 + delta ** 2 * n_a * n_b / total)
+        self.count = int(total)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else float("nan")
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+    @property
+    def skewness(self) -> float:
+        # Biased sample skewness g1, as scipy.stats.skew
+        return self.m3 / self.count / (self.m2 / self.count) ** 1.5 if self.m2 > 0 else float("nan")
+
+    @property
+    def kurtosis(self) -> float:
+        # Biased sample excess kurtosis g2, as scipy.stats.kurtosis
+        return self.m4 / self.count / (self.m2 / self.count) ** 2 - 3 if self.m2 > 0 else float("nan")
+
+# The functions below broadcast over numpy arrays of moments, so they serve single tests and batches alike.
+
+def ttest_from_moments(count1, mean1, var1, count2, mean2, var2, equal_var=True) -> Tuple[np.ndarray, np.ndarray]:
+    return stats.ttest_ind_from_stats(mean1, np.sqrt(var1), count1, mean2, np.sqrt(var2), count2, equal_var=equal_var)
+
+def cohens_d_from_moments(mean1, var1, mean2, var2):
+    pooled_std = np.sqrt((np.asarray(var1) + var2) / 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(pooled_std != 0, (np.asarray(mean1) - mean2) / pooled_std, 0.0)
+
+def mean_difference_confidence_interval(count1, mean1, var1, count2, mean2, var2, confidence=0.95) -> Tuple[np.ndarray, np.ndarray]:
+    mean_diff = np.asarray(mean1) - mean2
+    se = np.sqrt(np.asarray(var1) / count1 + np.asarray(var2) / count2)
+    df = np.asarray(count1) + count2 - 2
+    margin_of_error = stats.t.ppf((1 + confidence) / 2, df) * se
+    return mean_diff - margin_of_error, mean_diff + margin_of_error
+
+def anova_sums_of_squares(counts, means, m2s) -> Tuple[np.ndarray, np.ndarray]:
+    # Groups along axis 0
+    counts, means, m2s = (np.asarray(values, dtype=np.float64) for values in (counts, means, m2s))
+    grand_mean = np.sum(counts * means, axis=0) / np.sum(counts, axis=0)
+    ss_between = np.sum(counts * (means - grand_mean) ** 2, axis=0)
+    ss_within = np.sum(m2s, axis=0)
+    return ss_between, ss_within
+
+def anova_from_moments(counts, means, m2s) -> Tuple[np.ndarray, np.ndarray]:
+    ss_between, ss_within = anova_sums_of_squares(counts, means, m2s)
+    k = np.shape(counts)[0]
+    n = np.sum(counts, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f_stat = (ss_between / (k - 1)) / (ss_within / (n - k))
+    return f_stat, stats.f.sf(f_stat, k - 1, n - k)
+
+def welch_anova_from_moments(counts, means, m2s) -> Tuple[np.ndarray, np.ndarray]:
+    # Welch's one-way ANOVA, which does not assume equal variances
+    counts, means, m2s = (np.asarray(values, dtype=np.float64) for values in (counts, means, m2s))
+    k = counts.shape[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = counts * (counts - 1) / m2s
+        total_weight = np.sum(weights, axis=0)
+        weighted_mean = np.sum(weights * means, axis=0) / total_weight
+        between = np.sum(weights * (means - weighted_mean) ** 2, axis=0) / (k - 1)
+        correction = np.sum((1 - weights / total_weight) ** 2 / (counts - 1), axis=0)
+        f_stat = between / (1 + 2 * (k - 2) / (k ** 2 - 1) * correction)
+        df_within = (k ** 2 - 1) / (3 * correction)
+    return f_stat, stats.f.sf(f_stat, k - 1, df_within)
+
+def eta_squared_from_moments(counts, means, m2s):
+    ss_between, ss_within = anova_sums_of_squares(counts, means, m2s)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return ss_between / (ss_between + ss_within)
+
+def omega_squared_from_moments(counts, means, m2s):
+    # Less biased than eta squared for small samples; can be slightly negative when there is no effect
+    ss_between, ss_within = anova_sums_of_squares(counts, means, m2s)
+    k = np.shape(counts)[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ms_within = ss_within / (np.sum(counts, axis=0) - k)
+        return (ss_between - (k - 1) * ms_within) / (ss_between + ss_within + ms_within)
+
+def bartlett_from_moments(counts, variances) -> Tuple[np.ndarray, np.ndarray]:
+    # Bartlett's test for equal variances, which only needs counts and variances
+    counts, variances = (np.asarray(values, dtype=np.float64) for values in (counts, variances))
+    k = counts.shape[0]
+    n = np.sum(counts, axis=0)
+    pooled = np.sum((counts - 1) * variances, axis=0) / (n - k)
+    numerator = (n - k) * np.log(pooled) - np.sum((counts - 1) * np.log(variances), axis=0)
+    denominator = 1 + (np.sum(1 / (counts - 1), axis=0) - 1 / (n - k)) / (3 * (k - 1))
+    statistic = numerator / denominator
+    return statistic, stats.chi2.sf(statistic, k - 1)
+
+def normaltest_from_moments(counts, m2s, m3s, m4s) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    D'Agostino-Pearson K^2 normality test from central moment sums, matching scipy.stats.normaltest.
+    Needs one pass over the data (or none for streaming moments) instead of sorting like Shapiro-Wilk.
+    """
+    n, m2, m3, m4 = (np.asarray(values, dtype=np.float64) for values in (counts, m2s, m3s, m4s))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Skewness test
+        b1 = (m3 / n) / (m2 / n) ** 1.5
+        y = b1 * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+        beta2 = 3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alpha = np.sqrt(2.0 / (w2 - 1))
+        y = np.where(y == 0, 1, y)
+        z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+        # Kurtosis test
+        b2 = (m4 / n) / (m2 / n) ** 2
+        expected = 3.0 * (n - 1) / (n + 1)
+        variance_b2 = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+        x = (b2 - expected) / np.sqrt(variance_b2)
+        sqrt_beta1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * np.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3)))
+        a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / sqrt_beta1 ** 2))
+        denominator = 1 + x * np.sqrt(2 / (a - 4.0))
+        term = np.sign(denominator) * np.where(denominator == 0, np.nan, ((1 - 2.0 / a) / np.abs(denominator)) ** (1 / 3.0))
+        z_kurtosis = (1 - 2 / (9.0 * a) - term) / np.sqrt(2 / (9.0 * a))
+
+    statistic = z_skew ** 2 + z_kurtosis ** 2
+    # The approximations need at least 8 observations
+    statistic = np.where(n >= 8, statistic, np.nan)
+    return statistic, stats.chi2.sf(statistic, 2)
+
+def brown_forsythe(data_arrays: Sequence[np.ndarray]) -> Tuple[float, float]:
+    # Levene's test around the group medians (Brown-Forsythe): a one-way ANOVA on absolute deviations from the median
+    counts, means, m2s = [], [], []
+    for values in data_arrays:
+        deviations = np.abs(values - np.median(values))
+        mean = np.mean(deviations)
+        counts.append(len(values))
+        means.append(mean)
+        m2s.append(np.sum((deviations - mean) ** 2))
+    statistic, p_value = anova_from_moments(counts, means, m2s)
+    return float(statistic), float(p_value)
+
+def moments_arrays(moments: Sequence[RunningMoments]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return (np.array([m.count for m in moments], dtype=np.float64),
+            np.array([m.mean for m in moments]),
+            np.array([m.m2 for m in moments]))
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from typing import Tuple
+from scipy import stats
+import numpy as np
+
+@dataclass
+class OLSResult:
+    nobs: int
+    slope: float
+    intercept: float
+    slope_se: float
+    t_statistic: float
+    p_value: float
+    r_squared: float
+    confidence_interval: Tuple[float, float]
+    breusch_pagan_p: float
+    durbin_watson: float
+    residuals: np.ndarray
+
+@dataclass
+class BatchOLSResult:
+    nobs: int
+    slope: np.ndarray
+    intercept: np.ndarray
+    slope_se: np.ndarray
+    t_statistic: np.ndarray
+    p_value: np.ndarray
+    r_squared: np.ndarray
+    ci_lower: np.ndarray
+    ci_upper: np.ndarray
+    breusch_pagan_p: np.ndarray
+    durbin_watson: np.ndarray
+
+def _fit(X: np.ndarray, Y: np.ndarray, confidence: float):
+    # Simple regression y = a + b x per column, observations along axis 0
+    n = X.shape[0]
+    x_centered = X - np.mean(X, axis=0)
+    y_mean = np.mean(Y, axis=0)
+    sxx = np.sum(x_centered ** 2, axis=0)
+    sxy = np.sum(x_centered * (Y - y_mean), axis=0)
+    syy = np.sum((Y - y_mean) ** 2, axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = sxy / sxx
+        intercept = y_mean - slope * np.mean(X, axis=0)
+        residuals = Y - intercept - slope * X
+        sse = np.sum(residuals ** 2, axis=0)
+        slope_se = np.sqrt(sse / (n - 2) / sxx)
+        t_statistic = slope / slope_se
+        r_squared = 1 - sse / syy
+
+        # Breusch-Pagan (Koenker's studentized form): n * R^2 of the squared residuals on x
+        u_centered = residuals ** 2 - sse / n
+        r_squared_aux = np.sum(x_centered * u_centered, axis=0) ** 2 / (sxx * np.sum(u_centered ** 2, axis=0))
+        breusch_pagan_p = stats.chi2.sf(n * r_squared_aux, 1)
+
+        durbin_watson = np.sum(np.diff(residuals, axis=0) ** 2, axis=0) / sse
+
+    p_value = 2 * stats.t.sf(np.abs(t_statistic), n - 2)
+    margin_of_error = stats.t.ppf((1 + confidence) / 2, n - 2) * slope_se
+    return (n, slope, intercept, slope_se, t_statistic, p_value, r_squared,
+            slope - margin_of_error, slope + margin_of_error, breusch_pagan_p, durbin_watson, residuals)
+
+def batch_ols(X, Y, confidence=0.95) -> BatchOLSResult:
+    """
+    Fits many simple regressions at once, one per column of the (observations x regressions) arrays X and Y.
+    A 1-D X is shared by all columns of Y.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    Y = Y[:, None] if Y.ndim == 1 else Y
+    X = np.asarray(X, dtype=np.float64)
+    X = np.broadcast_to(X[:, None] if X.ndim == 1 else X, Y.shape)
+    *fields, _ = _fit(X, Y, confidence)
+    return BatchOLSResult(*fields)
+
+def simple_ols(x, y, confidence=0.95) -> OLSResult:
+    (n, slope, intercept, slope_se, t_statistic, p_value, r_squared, ci_lower, ci_upper,
+     breusch_pagan_p, durbin_watson, residuals) = _fit(np.asarray(x, dtype=np.float64)[:, None], np.asarray(y, dtype=np.float64)[:, None], confidence)
+    return OLSResult(
+        nobs=n,
+        slope=float(slope[0]),
+        intercept=float(intercept[0]),
+        slope_se=float(slope_se[0]),
+        t_statistic=float(t_statistic[0]),
+        p_value=float(p_value[0]),
+        r_squared=float(r_squared[0]),
+        confidence_interval=(float(ci_lower[0]), float(ci_upper[0])),
+        breusch_pagan_p=float(breusch_pagan_p[0]),
+        durbin_watson=float(durbin_watson[0]),
+        residuals=residuals[:, 0]
+    )
+
+def statsmodels_ols(x, y, confidence=0.95) -> OLSResult:
+    # Reference implementation for validating the closed-form engine
+    import statsmodels.api as sm
+    X = sm.add_constant(np.asarray(x, dtype=np.float64))
+    model = sm.OLS(np.asarray(y, dtype=np.float64), X).fit()
+    _, breusch_pagan_p, _, _ = sm.stats.het_breuschpagan(model.resid, X)
+    ci_lower, ci_upper = model.conf_int(alpha=1 - confidence)[1]
+    return OLSResult(
+        nobs=int(model.nobs),
+        slope=float(model.params[1]),
+        intercept=float(model.params[0]),
+        slope_se=float(model.bse[1]),
+        t_statistic=float(model.tvalues[1]),
+        p_value=float(model.pvalues[1]),
+        r_squared=float(model.rsquared),
+        confidence_interval=(float(ci_lower), float(ci_upper)),
+        breusch_pagan_p=float(breusch_pagan_p),
+        durbin_watson=float(sm.stats.durbin_watson(model.resid)),
+        residuals=np.asarray(model.resid)
+    )
@@ -0,0 +1,146 @@
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Tuple
+from scipy import stats
+import numpy as np
+from src.bootstrap import DEFAULT_MAX_CHUNK_ELEMENTS
+
+# "parametric":  p-values from the test's reference distribution
+# "permutation": p-values from permutations of the observations
+# "auto":        permutation p-values when a normality check fails
+INFERENCE_MODES = ("parametric", "permutation", "auto")
+
+DEFAULT_NUM_PERMUTATIONS = 10_000
+# Early stopping waits for this many permutations, so the reported p-value is never too coarse
+MIN_PERMUTATIONS_BEFORE_STOPPING = 100
+# Early stopping accepts this probability that the decision differs from the one after all permutations
+DEFAULT_STOP_ERROR = 1e-3
+# Permuted statistics within this relative distance of the observed one count as ties, not as rounding noise
+_TIE_TOLERANCE = 1e-12
+
+# Receives an (num_permutations, n) matrix of permuted positions and returns one statistic per row;
+# larger values are more extreme
+PermutedStatistic = Callable[[np.ndarray], np.ndarray]
+
+@dataclass
+class PermutationResult:
+    # Observed value of the permuted statistic, which orders permutations like the test statistic but may be a transform of it
+    statistic: float
+    p_value: float
+    num_permutations: int
+    exceedances: int
+    stopped_early: bool
+
+def _p_value_bounds(exceedances: int, num_permutations: int, error: float) -> Tuple[float, float]:
+    # Clopper-Pearson interval for the probability that a permuted statistic is at least the observed one
+    low = stats.beta.ppf(error / 2, exceedances, num_permutations - exceedances + 1) if exceedances > 0 else 0.0
+    high = stats.beta.ppf(1 - error / 2, exceedances + 1, num_permutations - exceedances) if exceedances < num_permutations else 1.0
+    return low, high
+
+def permutation_test(observed: float, permuted_statistic: PermutedStatistic, n: int, num_permutations=DEFAULT_NUM_PERMUTATIONS,
+                     rng: Optional[np.random.Generator] = None, chunk_size: Optional[int] = None, alpha: Optional[float] = None,
+                     stop_error=DEFAULT_STOP_ERROR, stop_significant=True) -> PermutationResult:
+    """
+    Monte Carlo permutation test of n pooled observations. Permutations are drawn as (chunk_size, n) index
+    matrices from a numpy Generator, so a seed or Generator as rng makes the result reproducible, and at most
+    DEFAULT_MAX_CHUNK_ELEMENTS indices are materialized at once by default. With alpha, the test stops after
+    a chunk once at least MIN_PERMUTATIONS_BEFORE_STOPPING permutations are done and a Clopper-Pearson
+    interval at level 1 - stop_error for the p-value lies entirely above or below alpha. With
+    stop_significant=False it only stops above alpha, so small p-values keep the resolution of all
+    permutations, e.g. for a multiple-comparison correction at a lower threshold afterwards.
+    """
+    rng = np.random.default_rng(rng)
+    if chunk_size is None:
+        chunk_size = DEFAULT_MAX_CHUNK_ELEMENTS // max(n, 1)
+    chunk = int(min(max(chunk_size, 1), num_permutations))
+    threshold = observed * (1 - _TIE_TOLERANCE)
+    positions = np.broadcast_to(np.arange(n), (chunk, n))
+
+    exceedances = done = 0
+    stopped_early = False
+    while done < num_permutations:
+        size = min(chunk, num_permutations - done)
+        statistics = permuted_statistic(rng.permuted(positions[:size], axis=1))
+        exceedances += int(np.count_nonzero(statistics >= threshold))
+        done += size
+        if alpha is not None and MIN_PERMUTATIONS_BEFORE_STOPPING <= done < num_permutations:
+            low, high = _p_value_bounds(exceedances, done, stop_error)
+            if low > alpha or (stop_significant and high < alpha):
+                stopped_early = True
+                break
+
+    return PermutationResult(
+        statistic=float(observed),
+        # The observed arrangement counts as one of the permutations, so the p-value is never zero
+        p_value=(exceedances + 1) / (done + 1),
+        num_permutations=done,
+        exceedances=exceedances,
+        stopped_early=stopped_early
+    )
+
+def _pooled(data_arrays: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Observations centered on the pooled mean, which keeps the sums of squares below accurate, and group boundaries
+    values = np.concatenate([np.asarray(data, dtype=np.float64) for data in data_arrays])
+    values -= np.mean(values)
+    counts = np.array([len(data) for data in data_arrays], dtype=np.float64)
+    starts = np.concatenate(([0], np.cumsum(counts[:-1]))).astype(np.intp)
+    return values, counts, starts
+
+def _group_sums(values: np.ndarray, squares: Optional[np.ndarray], positions: np.ndarray, counts: np.ndarray,
+                starts: np.ndarray, total: float, total_squares: float) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    # Sums (and sums of squares) of every group in every permutation; the last group follows from the precomputed totals
+    head = positions[:, :starts[-1]]
+    sums = np.add.reduceat(values[head], starts[:-1], axis=1)
+    sums = np.column_stack([sums, total - sums.sum(axis=1)])
+    if squares is None:
+        return sums, None
+    sums_of_squares = np.add.reduceat(squares[head], starts[:-1], axis=1)
+    return sums, np.column_stack([sums_of_squares, total_squares - sums_of_squares.sum(axis=1)])
+
+def _welch_f(counts, sums, sums_of_squares) -> np.ndarray:
+    # Welch's F along the last axis
+    k = counts.shape[-1]
+    means = sums / counts
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = counts * (counts - 1) / (sums_of_squares - sums * means)
+        total_weight = np.sum(weights, axis=-1, keepdims=True)
+        weighted_mean = np.sum(weights * means, axis=-1, keepdims=True) / total_weight
+        between = np.sum(weights * (means - weighted_mean) ** 2, axis=-1) / (k - 1)
+        correction = np.sum((1 - weights / total_weight) ** 2 / (counts - 1), axis=-1)
+        return between / (1 + 2 * (k - 2) / (k ** 2 - 1) * correction)
+
+def anova_permutation(data_arrays: Sequence[np.ndarray], equal_var=True, **kwargs) -> PermutationResult:
+    """
+    Permutation test of the one-way ANOVA F statistic, or Welch's F with equal_var=False. The pooled sum and
+    sum of squares do not change under permutation, so the classic F only needs the group sums of each
+    permutation, which are one gather and one segmented sum per chunk. Keyword arguments go to permutation_test.
+    """
+    values, counts, starts = _pooled(data_arrays)
+    squares = None if equal_var else values ** 2
+    total, total_squares = float(np.sum(values)), float(np.sum(values ** 2))
+
+    def statistic(positions: np.ndarray) -> np.ndarray:
+        sums, sums_of_squares = _group_sums(values, squares, positions, counts, starts, total, total_squares)
+        if not equal_var:
+            return _welch_f(counts, sums, sums_of_squares)
+        # F grows with the between-group sum of squares, since the total sum of squares is fixed
+        return np.sum(sums ** 2 / counts, axis=1)
+
+    observed = statistic(np.arange(len(values))[None, :])[0]
+    return permutation_test(observed, statistic, len(values), **kwargs)
+
+def ttest_permutation(a: np.ndarray, b: np.ndarray, equal_var=True, **kwargs) -> PermutationResult:
+    # Two-sided test of the pooled or Welch t statistic; |t| orders permutations like the two-group F
+    return anova_permutation([a, b], equal_var=equal_var, **kwargs)
+
+def regression_permutation(x: np.ndarray, y: np.ndarray, **kwargs) -> PermutationResult:
+    """
+    Permutation test of the slope of y on x, permuting y against x. The t statistic of the slope grows with
+    |r|, and only the cross product changes under permutation, so each permutation costs one dot product.
+    """
+    x = np.asarray(x, dtype=np.float64) - np.mean(x)
+    y = np.asarray(y, dtype=np.float64) - np.mean(y)
+
+    def statistic(positions: np.ndarray) -> np.ndarray:
+        return np.abs(y[positions] @ x)
+
+    return permutation_test(float(abs(y @ x)), statistic, len(y), **kwargs)
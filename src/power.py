@@ -0,0 +1,155 @@
+from functools import lru_cache
+from typing import Dict, Tuple
+from scipy import optimize, special
+import numpy as np
+
+POWER_TESTS = ("ttest", "anova")
+
+def power(effect_size, nobs, alpha=0.05, k_groups=2, test="ttest"):
+    """
+    Vectorized power of a two-sided independent t-test (nobs per group, equal sizes)
+    or of a one-way ANOVA F-test (nobs in total), matching statsmodels' TTestIndPower
+    and FTestAnovaPower. Uses scipy.special directly, which is about 20x faster than the
+    scipy.stats distributions for the scalar calls of a sample-size solve.
+    """
+    effect_size, nobs = np.abs(np.asarray(effect_size, dtype=np.float64)), np.asarray(nobs, dtype=np.float64)
+    if test == "ttest":
+        df = 2 * nobs - 2
+        nc = effect_size * np.sqrt(nobs / 2)
+        crit = -special.stdtrit(df, alpha / 2)
+        # The lower tail is NaN where it underflows for large noncentralities; fmax turns that into 0
+        return 1 - special.nctdtr(df, nc, crit) + np.fmax(special.nctdtr(df, nc, -crit), 0)
+    if test == "anova":
+        df_num, df_denom = k_groups - 1, nobs - k_groups
+        # Upper alpha quantile of F through the beta distribution, which stays accurate for small alpha
+        x = special.betainccinv(df_num / 2, df_denom / 2, alpha)
+        with np.errstate(divide="ignore"):
+            crit = df_denom * x / (df_num * (1 - x))
+        return 1 - special.ncfdtr(df_num, df_denom, effect_size ** 2 * nobs, crit)
+    raise ValueError(f"Unknown power test '{test}', expected one of {POWER_TESTS}")
+
+def _lower_bound(k_groups: int, test: str) -> float:
+    # Smallest nobs with positive degrees of freedom
+    return 1.0 if test == "ttest" else float(k_groups)
+
+def solve_sample_size(effect_size: float, alpha=0.05, target_power=0.8, k_groups=2, test="ttest", xtol=1e-8) -> float:
+    """
+    Sample size for a single effect size by Brent's method on log(nobs), bracketed around the normal
+    approximation, which is within a few percent for the t-test. About 8 power evaluations per solve;
+    xtol is the absolute tolerance in log(nobs), so a relative one in nobs.
+    """
+    effect_size = abs(float(effect_size))
+    if not effect_size > 0:
+        return float("nan")
+    # Below one observation above the lower bound the power is numerically unreliable, so tiny samples are left to the bisection
+    log_floor = np.log(_lower_bound(k_groups, test) + 1)
+
+    def shortfall(log_nobs: float) -> float:
+        return float(power(effect_size, np.exp(log_nobs), alpha, k_groups, test)) - target_power
+
+    z = special.ndtri(1 - alpha / 2) + special.ndtri(target_power)
+    # Per group for the t-test, in total for the F-test with f = d / 2
+    lo = hi = np.log((2 if test == "ttest" else 1) * (z / effect_size) ** 2)
+    if lo <= log_floor:
+        return float(solve_sample_sizes(effect_size, alpha, target_power, k_groups, test)[0])
+    f_lo = f_hi = shortfall(lo)
+    step = np.log(1.25)
+    # Widen the bracket in the direction of the root, doubling the step each time
+    for _ in range(64):
+        if f_hi >= 0:
+            break
+        lo, f_lo = hi, f_hi
+        hi += step
+        f_hi = shortfall(hi)
+        step *= 2
+    else:
+        # The target power is not reached, e.g. because it is 1
+        return float("nan")
+    while f_lo >= 0:
+        hi = lo
+        lo -= step
+        if lo <= log_floor:
+            return float(solve_sample_sizes(effect_size, alpha, target_power, k_groups, test)[0])
+        f_lo = shortfall(lo)
+        step *= 2
+    return float(np.exp(optimize.brentq(shortfall, lo, hi, xtol=xtol)))
+
+def solve_sample_sizes(effect_sizes, alpha=0.05, target_power=0.8, k_groups=2, test="ttest", rtol=1e-10):
+    # Vectorized bisection on log(nobs) for arrays of effect sizes; power increases monotonically with nobs
+    effect_sizes = np.abs(np.atleast_1d(np.asarray(effect_sizes, dtype=np.float64)))
+    lower_bound = _lower_bound(k_groups, test)
+    lo = np.full(effect_sizes.shape, lower_bound + 1e-9)
+    hi = np.full(effect_sizes.shape, lower_bound + 10.0)
+    solvable = effect_sizes > 0
+    for _ in range(64):
+        # Grow the bracket by factors of 4 until the target power is reached
+        short = solvable & (power(effect_sizes, hi, alpha, k_groups, test) < target_power)
+        if not np.any(short):
+            break
+        lo = np.where(short, hi, lo)
+        hi = np.where(short, hi * 4, hi)
+
+    log_lo, log_hi = np.log(lo), np.log(hi)
+    while np.max(log_hi - log_lo, initial=0) > rtol:
+        mid = (log_lo + log_hi) / 2
+        reached = power(effect_sizes, np.exp(mid), alpha, k_groups, test) >= target_power
+        log_hi = np.where(reached, mid, log_hi)
+        log_lo = np.where(reached, log_lo, mid)
+    return np.where(solvable, np.exp(log_hi), np.nan)
+
+class PowerAnalysis:
+    """
+    Sample-size solver shared across experiments and repetitions.
+
+    Solves are memoized in a bounded LRU cache keyed on the effect size rounded to `decimals`
+    (the experiments already report effect sizes to 3 decimals), alpha, power, k_groups and test.
+    Precomputed grids answer lookups by log-log interpolation without solving at all.
+    """
+    def __init__(self, maxsize=4096, decimals=3):
+        self.decimals = decimals
+        self._grids: Dict[Tuple[str, float, float, int], Tuple[np.ndarray, np.ndarray]] = {}
+        self._solve = lru_cache(maxsize=maxsize)(self._solve_uncached)
+
+    def _solve_uncached(self, effect_size: float, alpha: float, target_power: float, k_groups: int, test: str) -> float:
+        return solve_sample_size(effect_size, alpha, target_power, k_groups, test)
+
+    def sample_size(self, effect_size: float, alpha=0.05, target_power=0.8, k_groups=2, test="ttest") -> float:
+        effect_size = round(abs(float(effect_size)), self.decimals)
+        grid = self._grids.get((test, alpha, target_power, k_groups))
+        if grid is not None and grid[0][0] <= effect_size <= grid[0][-1]:
+            return float(self._interpolate(grid, effect_size))
+        return self._solve(effect_size, alpha, target_power, k_groups, test)
+
+    def sample_sizes(self, effect_sizes, alpha=0.05, target_power=0.8, k_groups=2, test="ttest") -> np.ndarray:
+        effect_sizes = np.abs(np.asarray(effect_sizes, dtype=np.float64))
+        grid = self._grids.get((test, alpha, target_power, k_groups))
+        if grid is None:
+            return solve_sample_sizes(effect_sizes, alpha, target_power, k_groups, test).reshape(effect_sizes.shape)
+        # Grid lookups inside the precomputed range, exact solves outside of it
+        sizes = np.empty(effect_sizes.shape)
+        inside = (effect_sizes >= grid[0][0]) & (effect_sizes <= grid[0][-1])
+        sizes[inside] = self._interpolate(grid, effect_sizes[inside])
+        sizes[~inside] = solve_sample_sizes(effect_sizes[~inside], alpha, target_power, k_groups, test)
+        return sizes
+
+    def precompute_grid(self, effect_sizes=None, alpha=0.05, target_power=0.8, k_groups=2, test="ttest") -> None:
+        if effect_sizes is None:
+            effect_sizes = np.geomspace(0.01, 5, 512)
+        effect_sizes = np.unique(np.abs(np.asarray(effect_sizes, dtype=np.float64)))
+        effect_sizes = effect_sizes[effect_sizes > 0]
+        self._grids[(test, alpha, target_power, k_groups)] = (effect_sizes, solve_sample_sizes(effect_sizes, alpha, target_power, k_groups, test))
+
+    def power_curve(self, effect_size: float, nobs, alpha=0.05, k_groups=2, test="ttest") -> np.ndarray:
+        return power(effect_size, nobs, alpha, k_groups, test)
+
+    def cache_info(self):
+        return self._solve.cache_info()
+
+    @staticmethod
+    def _interpolate(grid: Tuple[np.ndarray, np.ndarray], effect_sizes):
+        # Sample sizes scale roughly with 1 / effect_size^2, so interpolate linearly in log-log space
+        grid_effects, grid_sizes = grid
+        return np.exp(np.interp(np.log(effect_sizes), np.log(grid_effects), np.log(grid_sizes)))
+
+# Shared by all experiments so that repetitions reuse each other's solves
+default_power_analysis = PowerAnalysis()
@@ -1,14 +1,14 @@
 from dataclasses import dataclass
-from typing import Tuple
-from scipy import stats
-import statsmodels.api as sm
-import logging
+from typing import Optional, Tuple
 import random
 import numpy as np
 from src.utils import Group, Experiment, CheckAssumptionsResult, TestResult
+from src.assumptions import resolve_mode, normality_p_values, status
+from src.sink import JsonLinesSink
+from src.ols import OLSResult, simple_ols, statsmodels_ols
+from src.permutation import PermutationResult, regression_permutation
 
-# Configure logging to save results
-logging.basicConfig(filename='regression_results.log', level=logging.INFO, format='%(asctime)s - %(message)s')
+OLS_ENGINES = {"closed_form": simple_ols, "statsmodels": statsmodels_ols}
 
 @dataclass
 class RegressionCheckAssumptionsResult(CheckAssumptionsResult):
@@ -18,64 +18,77 @@ class RegressionCheckAssumptionsResult(CheckAssumptionsResult):
     normality_p: float
     homoscedasticity_p: float
     independence: str
+    check_method: str = "exact"
 
 class RegressionExperiment(Experiment):
-    def check_assumptions(self) -> RegressionCheckAssumptionsResult:
-        data_arrays = [group.get_data_array() for group in self.groups]
-        X = sm.add_constant(data_arrays[0])  # Adding constant for intercept
-        y = data_arrays[1]
+    def __init__(self, *args, engine="closed_form", **kwargs):
+        # engine: "closed_form" (vectorized sums) or "statsmodels" (reference path for validation)
+        super().__init__(*args, **kwargs)
+        if engine not in OLS_ENGINES:
+            raise ValueError(f"Unknown OLS engine '{engine}', expected one of {tuple(OLS_ENGINES)}")
+        self.engine = engine
+
+    def result_config(self) -> dict:
+        return {**super().result_config(), "engine": self.engine}
+
+    def fit_model(self) -> OLSResult:
+        def fit():
+            data_arrays = self.data_arrays()
+            return OLS_ENGINES[self.engine](data_arrays[0], data_arrays[1], self.confidence)
+        # Fit linear regression model once per run
+        return self.cached("ols_model", fit)
 
-        # Fit linear regression model
-        model = sm.OLS(y, X).fit()
-        residuals = model.resid
+    def check_assumptions(self) -> RegressionCheckAssumptionsResult:
+        model = self.fit_model()
 
-        # Normality check (Shapiro-Wilk test)
-        normality_p = stats.shapiro(residuals).pvalue
+        # Normality of the residuals (Shapiro-Wilk, or its large-sample replacement)
+        mode = resolve_mode(self.assumption_checks, [len(model.residuals)], self.assumption_sample_size)
+        normality_p = normality_p_values(mode, [model.residuals], sample_size=self.assumption_sample_size)[0]
 
         # Homoscedasticity (Breusch-Pagan test)
-        _, homoscedasticity_p, _, _ = sm.stats.het_breuschpagan(residuals, X)
+        homoscedasticity_p = model.breusch_pagan_p
 
         # Check independence (Durbin-Watson test for autocorrelation)
-        dw_stat = sm.stats.durbin_watson(residuals)
-        independence_status = "Pass" if 1.5 < dw_stat < 2.5 else "Fail"
+        independence_status = "Pass" if 1.5 < model.durbin_watson < 2.5 else "Fail"
 
         return RegressionCheckAssumptionsResult(
-            normality={"residuals": "Pass" if normality_p > 0.05 else "Fail"},
+            normality={"residuals": status(normality_p)},
             variance_homogeneity="Pass" if homoscedasticity_p > 0.05 else "Fail",
             variance_p=homoscedasticity_p,
             normality_p=normality_p,
             homoscedasticity_p=homoscedasticity_p,
-            independence=independence_status
+            independence=independence_status,
+            check_method=mode
         )
 
     def calculate_effect_size(self) -> float:
-        data_arrays = [group.get_data_array() for group in self.groups]
-        X = sm.add_constant(data_arrays[0])
-        y = data_arrays[1]
-
-        model = sm.OLS(y, X).fit()
-        r_squared = model.rsquared
-        return round(np.sqrt(r_squared), 3)  # Cohen's f^2
+        model = self.fit_model()
+        return round(np.sqrt(model.r_squared), 3)  # Cohen's f^2
 
     def calculate_confidence_interval(self) -> Tuple[float, float]:
-        data_arrays = [group.get_data_array() for group in self.groups]
-        X = sm.add_constant(data_arrays[0])
-        y = data_arrays[1]
-
-        model = sm.OLS(y, X).fit()
-        ci_lower, ci_upper = model.conf_int()[1]  # Confidence interval for the slope
+        ci_lower, ci_upper = self.fit_model().confidence_interval  # Confidence interval for the slope
         return round(ci_lower, 3), round(ci_upper, 3)
 
+    def permutation_test(self, num_permutations: Optional[int] = None, chunk_size=None, early_stopping=True,
+                         stop_significant=True) -> PermutationResult:
+        # Permutes y against x; the slope's t statistic grows with |r|
+        x, y = self.data_arrays()[:2]
+        return regression_permutation(x, y, num_permutations=num_permutations or self.num_permutations, rng=self.rng,
+                                      chunk_size=chunk_size, alpha=self.alpha if early_stopping else None, stop_significant=stop_significant)
+
     def perform_test(self) -> TestResult:
-        assumptions = self.check_assumptions()
-        data_arrays = [group.get_data_array() for group in self.groups]
-        X = sm.add_constant(data_arrays[0])
-        y = data_arrays[1]
-
-        model = sm.OLS(y, X).fit()
-        p_value = model.pvalues[1]  # P-value for the slope coefficient
-        t_stat = model.tvalues[1]   # T-statistic for the slope coefficient
+        with self.phase("check_assumptions"):
+            assumptions = self.assumptions()
+        model = self.fit_model()
+        p_value = model.p_value  # P-value for the slope coefficient
+        t_stat = model.t_statistic   # T-statistic for the slope coefficient
         effect_size = self.calculate_effect_size()
+        inference = "parametric"
+        if self.use_permutation(assumptions):
+            with self.phase("permutation"):
+                # Only stops early above alpha, since small p-values may be corrected across repetitions afterwards
+                p_value = self.permutation_test(stop_significant=False).p_value
+            inference = "permutation"
 
         required_sample_size = 0  # Sample size calculation can be added later
 
@@ -93,9 +106,10 @@ class RegressionExperiment(Experiment):
             required_sample_size_per_group=required_sample_size,
             confidence_interval=self.calculate_confidence_interval(),
             conclusion=conclusion,
-            assumptions=assumptions
+            assumptions=assumptions,
+            inference=inference
         )
-        logging.info(result)
+        self.sink.emit("test_result", result)
         return result
 
 if __name__ == "__main__":
@@ -123,6 +137,8 @@ if __name__ == "__main__":
     num_experiments = 10
     alpha = 0.05 / num_experiments  # Bonferroni correction
 
-    experiment = RegressionExperiment([group1, group2], "regression", alpha=alpha)
+    sink = JsonLinesSink("regression_results.jsonl")
+    experiment = RegressionExperiment([group1, group2], "regression", alpha=alpha, sink=sink)
     experiment.pre_register("There is a significant relationship between X and Y")
-    experiment.run_experiment_multiple_times(fetch_data, num_experiments=num_experiments)
\ No newline at end of file
+    experiment.run_experiment_multiple_times(fetch_data, num_experiments=num_experiments)
+    sink.close()
@@ -0,0 +1,72 @@
+from typing import Sequence
+from scipy import stats, optimize
+import numpy as np
+
+SPENDING_FUNCTIONS = ("obrien_fleming", "pocock")
+
+def alpha_spent(information_fraction, alpha=0.05, spending="obrien_fleming"):
+    # Lan-DeMets spending functions for a symmetric two-sided test (alpha / 2 spent on each side)
+    t = np.asarray(information_fraction, dtype=np.float64)
+    if spending == "obrien_fleming":
+        return 4 * stats.norm.sf(stats.norm.isf(alpha / 4) / np.sqrt(t))
+    if spending == "pocock":
+        return alpha * np.log(1 + (np.e - 1) * t)
+    raise ValueError(f"Unknown spending function '{spending}', expected one of {SPENDING_FUNCTIONS}")
+
+def _simpson_weights(grid: np.ndarray) -> np.ndarray:
+    step = grid[1] - grid[0]
+    weights = np.ones(len(grid))
+    weights[1:-1:2] = 4
+    weights[2:-1:2] = 2
+    return weights * step / 3
+
+def sequential_boundaries(information_fractions: Sequence[float], alpha=0.05, spending="obrien_fleming", grid_points=401) -> np.ndarray:
+    """
+    Two-sided z boundaries for group-sequential looks at the given information fractions.
+
+    At look k the boundary c_k is chosen so that the probability under H0 of first crossing
+    at look k equals the alpha spent between looks k-1 and k. The joint distribution of the
+    score process is integrated numerically on a grid (Armitage, McPherson and Rowe).
+    """
+    fractions = np.asarray(information_fractions, dtype=np.float64)
+    if np.any(np.diff(fractions) <= 0) or fractions[0] <= 0 or fractions[-1] > 1:
+        raise ValueError("Information fractions must be increasing and within (0, 1]")
+    if grid_points % 2 == 0:
+        grid_points += 1
+    increments = np.diff(alpha_spent(fractions, alpha, spending), prepend=0.0)
+
+    boundaries = np.empty(len(fractions))
+    grid = weights = density = None
+    previous = 0.0
+    for k, t in enumerate(fractions):
+        if k == 0:
+            boundaries[k] = stats.norm.isf(increments[k] / 2)
+        else:
+            # Score S_k = Z_k * sqrt(t_k) moves from S_{k-1} by an independent N(0, t_k - t_{k-1}) step
+            sd = np.sqrt(t - previous)
+            mass = weights * density
+
+            def exit_probability(c):
+                bound = c * np.sqrt(t)
+                return np.sum(mass * (stats.norm.cdf((-bound - grid) / sd) + stats.norm.sf((bound - grid) / sd)))
+
+            boundaries[k] = optimize.brentq(lambda c: exit_probability(c) - increments[k], 1e-6, 40.0)
+
+        # Density of the score on the continuation region of look k
+        bound = boundaries[k] * np.sqrt(t)
+        next_grid = np.linspace(-bound, bound, grid_points)
+        if k == 0:
+            density = stats.norm.pdf(next_grid, scale=np.sqrt(t))
+        else:
+            density = stats.norm.pdf((next_grid[:, None] - grid[None, :]) / sd) @ (weights * density) / sd
+        grid, weights, previous = next_grid, _simpson_weights(next_grid), t
+    return boundaries
+
+def conditional_power(z_statistic: float, information_fraction: float, final_boundary: float) -> float:
+    # Probability of crossing the final boundary if the current trend continues
+    if information_fraction >= 1:
+        return float(abs(z_statistic) >= final_boundary)
+    z = abs(z_statistic)
+    drift = z / np.sqrt(information_fraction)
+    remaining = 1 - information_fraction
+    return float(stats.norm.sf((final_boundary - z * np.sqrt(information_fraction) - drift * remaining) / np.sqrt(remaining)))
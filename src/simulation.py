@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from scipy import stats
+import numpy as np
+from src.moments import ttest_from_moments, anova_from_moments
+
+SIMULATION_TESTS = ("ttest", "anova", "chi_squared")
+
+# Upper bound on the number of simulated values held in memory per chunk (~32 MB of float64)
+DEFAULT_MAX_CHUNK_ELEMENTS = 2 ** 22
+
+@dataclass
+class SimulationResult:
+    test: str
+    replicates: int
+    alpha: float
+    rejection_rate: float
+    statistics: np.ndarray
+    p_values: np.ndarray
+
+    def __str__(self):
+        return (f"SimulationResult:\n"
+                f"  Test: {self.test}\n"
+                f"  Replicates: {self.replicates}\n"
+                f"  Alpha: {self.alpha}\n"
+                f"  Rejection Rate: {self.rejection_rate}\n"
+                f"  P-value Quantiles (5%, 50%, 95%): {tuple(round(float(q), 3) for q in np.quantile(self.p_values, [0.05, 0.5, 0.95]))}")
+
+def simulate_datasets(rng: np.random.Generator, distribution: str, group_params: List[Dict], replicates: int, n: int) -> np.ndarray:
+    # distribution names a numpy Generator method (normal, lognormal, exponential, ...), called with each group's params
+    sampler = getattr(rng, distribution)
+    return np.stack([sampler(**params, size=(replicates, n)) for params in group_params], axis=1)
+
+def ttest_replicates(data: np.ndarray, equal_var=True):
+    # data has shape (replicates, 2, n)
+    means = np.mean(data, axis=-1)
+    variances = np.var(data, axis=-1, ddof=1)
+    n = data.shape[-1]
+    return ttest_from_moments(n, means[:, 0], variances[:, 0], n, means[:, 1], variances[:, 1], equal_var=equal_var)
+
+def anova_replicates(data: np.ndarray):
+    # data has shape (replicates, k, n); the moment helpers expect groups along axis 0
+    means = np.mean(data, axis=-1)
+    m2s = np.sum((data - means[..., None]) ** 2, axis=-1)
+    counts = np.full(means.shape, data.shape[-1])
+    return anova_from_moments(counts.T, means.T, m2s.T)
+
+def chi_squared_replicates(tables: np.ndarray, correction=True):
+    # tables has shape (replicates, groups, categories); empty rows and columns do not count towards the degrees of freedom
+    tables = tables.astype(np.float64)
+    row_totals = np.sum(tables, axis=2, keepdims=True)
+    col_totals = np.sum(tables, axis=1, keepdims=True)
+    expected = row_totals * col_totals / np.sum(tables, axis=(1, 2), keepdims=True)
+    dof = (np.count_nonzero(row_totals[:, :, 0], axis=1) - 1) * (np.count_nonzero(col_totals[:, 0, :], axis=1) - 1)
+    if correction:
+        # Yates' continuity correction where the table has one degree of freedom
+        diff = expected - tables
+        adjusted = tables + np.sign(diff) * np.minimum(0.5, np.abs(diff))
+        tables = np.where((dof == 1)[:, None, None], adjusted, tables)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cells = np.where(expected > 0, (tables - expected) ** 2 / expected, 0.0)
+    statistics = np.sum(cells, axis=(1, 2))
+    p_values = np.where(dof > 0, stats.chi2.sf(statistics, np.maximum(dof, 1)), 1.0)
+    return statistics, p_values
+
+def simulate_power(test="ttest", group_params: Optional[List] = None, n=100, replicates=10000, alpha=0.05, distribution="normal",
+                   equal_var=True, seed=None, chunk_size=None) -> SimulationResult:
+    """
+    Estimates the rejection rate of a test over many synthetic experiments in vectorized chunks.
+
+    For "ttest" and "anova", group_params holds one dict of keyword arguments per group for the numpy
+    Generator method named by distribution, e.g. [{"loc": 0, "scale": 1}, {"loc": 0.2, "scale": 1}].
+    For "chi_squared", group_params holds one list of category probabilities per group and the counts
+    are drawn from a multinomial. With identical groups the rejection rate is the empirical false-positive rate;
+    without group_params, two or three (ANOVA) standard normal groups or two groups with two equally likely categories are used.
+    """
+    if test not in SIMULATION_TESTS:
+        raise ValueError(f"Unknown simulation test '{test}', expected one of {SIMULATION_TESTS}")
+    if group_params is None:
+        # Identical groups, so the default estimates the false-positive rate
+        if test == "chi_squared":
+            group_params = [[0.5, 0.5]] * 2
+        else:
+            group_params = [{"loc": 0.0, "scale": 1.0}] * (3 if test == "anova" else 2)
+    rng = np.random.default_rng(seed)
+    values_per_replicate = len(group_params) * (len(group_params[0]) if test == "chi_squared" else n)
+    chunk = int(min(chunk_size or max(DEFAULT_MAX_CHUNK_ELEMENTS // values_per_replicate, 1), replicates))
+
+    statistics = np.empty(replicates)
+    p_values = np.empty(replicates)
+    for start in range(0, replicates, chunk):
+        size = min(chunk, replicates - start)
+        if test == "chi_squared":
+            tables = np.stack([rng.multinomial(n, probabilities, size=size) for probabilities in group_params], axis=1)
+            statistic, p_value = chi_squared_replicates(tables)
+        else:
+            data = simulate_datasets(rng, distribution, group_params, size, n)
+            statistic, p_value = ttest_replicates(data, equal_var) if test == "ttest" else anova_replicates(data)
+        statistics[start:start + size] = statistic
+        p_values[start:start + size] = p_value
+
+    return SimulationResult(
+        test=test,
+        replicates=replicates,
+        alpha=alpha,
+        rejection_rate=float(np.mean(p_values < alpha)),
+        statistics=statistics,
+        p_values=p_values
+    )
@@ -0,0 +1,132 @@
+import dataclasses
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+class ResultSink:
+    """
+    Destination for the records an experiment produces (pre-registrations, test results, aggregates).
+    The base class discards everything, so it doubles as the quiet mode for throughput runs.
+    """
+    def emit(self, kind: str, record: Any) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class NullSink(ResultSink):
+    pass
+
+class MemorySink(ResultSink):
+    # Keeps records in memory, e.g. to ship them back from worker processes
+    def __init__(self):
+        self.records: List[Tuple[str, Any]] = []
+
+    def emit(self, kind: str, record: Any) -> None:
+        self.records.append((kind, record))
+
+class LoggingSink(ResultSink):
+    # Writes each record through the standard logging module, like the old per-module log files
+    def __init__(self, logger: logging.Logger = None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("src")
+        self.level = level
+
+    def emit(self, kind: str, record: Any) -> None:
+        self.logger.log(self.level, "%s: %s", kind, record)
+
+def _json_default(value):
+    # numpy scalars and arrays
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+class JsonLinesSink(ResultSink):
+    """
+    Queue-backed sink that formats and appends records as JSON Lines on a background thread,
+    so the experiment only pays for a queue put. Records are written in batches of up to batch_size.
+    The file is opened up front, so a bad path fails in the constructor. A write error on the thread
+    is raised by the next emit, flush or close; records queued after it are discarded.
+    """
+    _STOP = object()
+
+    def __init__(self, path: str, batch_size=1000, max_queue_size=100000):
+        self.path = path
+        self.batch_size = batch_size
+        self._file = open(path, "a")
+        self._error: Optional[BaseException] = None
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._write_loop, name="JsonLinesSink", daemon=True)
+        self._closed = False
+        self._thread.start()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def emit(self, kind: str, record: Any) -> None:
+        if self._closed:
+            raise ValueError(f"Sink for '{self.path}' is closed")
+        self._raise_error()
+        self._queue.put((kind, time.time(), record))
+
+    def flush(self) -> None:
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._queue.put(self._STOP)
+            self._thread.join()
+            self._file.close()
+        self._raise_error()
+
+    def _write_loop(self) -> None:
+        # Keeps draining the queue after an error, so emit and flush never wait on a dead writer
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if self._error is None:
+                    lines = [_format_line(*item) for item in batch if item is not self._STOP]
+                    self._file.write("".join(lines))
+                    self._file.flush()
+            except Exception as error:
+                self._error = error
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if any(item is self._STOP for item in batch):
+                return
+
+def _format_line(kind: str, timestamp: float, record: Any) -> str:
+    if dataclasses.is_dataclass(record) and not isinstance(record, type):
+        record = dataclasses.asdict(record)
+    return json.dumps({"kind": kind, "time": timestamp, "record": record}, default=_json_default) + "\n"
+
+_default_sink: ResultSink = NullSink()
+
+def configure_sink(sink: ResultSink) -> ResultSink:
+    # Sets the sink used by experiments that were not given one explicitly; returns the previous sink
+    global _default_sink
+    previous, _default_sink = _default_sink, sink
+    return previous
+
+def get_default_sink() -> ResultSink:
+    return _default_sink
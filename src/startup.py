@@ -0,0 +1,59 @@
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+# Modules the engines must not pull in at import time; they are loaded on first use
+HEAVY_MODULES = ("openai", "dotenv", "statsmodels")
+ENGINE_MODULES = ("src.ttest", "src.anova", "src.chi", "src.regr")
+# Budget for importing one engine module in a fresh interpreter; scipy.stats accounts for most of it
+DEFAULT_BUDGET_MS = 2000.0
+
+@dataclass
+class ImportTimeResult:
+    module: str
+    cumulative_ms: float
+    heavy_modules: List[str]
+    budget_ms: float
+
+    @property
+    def within_budget(self) -> bool:
+        return self.cumulative_ms <= self.budget_ms and not self.heavy_modules
+
+    def __str__(self):
+        status = "OK" if self.within_budget else "FAIL"
+        heavy = f", loaded {', '.join(self.heavy_modules)}" if self.heavy_modules else ""
+        return f"{status} {self.module}: {self.cumulative_ms:.1f} ms (budget {self.budget_ms:.0f} ms){heavy}"
+
+def _parse_importtime(stderr: str) -> Dict[str, float]:
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, total, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(total) / 1000
+    return cumulative
+
+def measure_import(module: str, budget_ms=DEFAULT_BUDGET_MS, heavy_modules: Sequence[str] = HEAVY_MODULES) -> ImportTimeResult:
+    # Imports the module in a fresh interpreter with -X importtime, so nothing is served from this process' module cache
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, check=True)
+    cumulative = _parse_importtime(completed.stderr)
+    return ImportTimeResult(
+        module=module,
+        cumulative_ms=cumulative.get(module, 0.0),
+        heavy_modules=[name for name in heavy_modules if name in cumulative],
+        budget_ms=budget_ms
+    )
+
+def check_import_budget(modules: Sequence[str] = ENGINE_MODULES, budget_ms=DEFAULT_BUDGET_MS) -> List[ImportTimeResult]:
+    return [measure_import(module, budget_ms) for module in modules]
+
+if __name__ == "__main__":
+    # Usage: python -m src.startup [budget_ms]
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    results = check_import_budget(budget_ms=budget)
+    for result in results:
+        print(result)
+    sys.exit(0 if all(result.within_budget for result in results) else 1)
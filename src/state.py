@@ -0,0 +1,210 @@
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from src.moments import RunningMoments, anova_from_moments
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy (DDSketch): values are counted in logarithmic buckets,
+    so every quantile estimate is within relative_accuracy of an actual value. Merging adds the bucket counts,
+    which makes merge associative and commutative, and the number of buckets grows only with the log of the range.
+    """
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def _add_to_store(self, store: Dict[int, int], magnitudes: np.ndarray) -> None:
+        if len(magnitudes) == 0:
+            return
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        offset = keys.min()
+        counts = np.bincount(keys - offset)
+        for index in np.flatnonzero(counts):
+            key = int(index + offset)
+            store[key] = store.get(key, 0) + int(counts[index])
+
+    def add(self, values) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self._add_to_store(self.positive, values[values > 0])
+        self._add_to_store(self.negative, -values[values < 0])
+        self.zero_count += int(np.count_nonzero(values == 0))
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if not np.isclose(self.relative_accuracy, other.relative_accuracy):
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        merged = QuantileSketch(self.relative_accuracy)
+        for store, first, second in ((merged.positive, self.positive, other.positive), (merged.negative, self.negative, other.negative)):
+            store.update(first)
+            for key, count in second.items():
+                store[key] = store.get(key, 0) + count
+        merged.zero_count = self.zero_count + other.zero_count
+        merged.count = self.count + other.count
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        return merged
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _buckets(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Representative values and counts in ascending order of value
+        negative_keys = sorted(self.negative, reverse=True)
+        positive_keys = sorted(self.positive)
+        values = ([-self._value(key) for key in negative_keys] + ([0.0] if self.zero_count else [])
+                  + [self._value(key) for key in positive_keys])
+        counts = ([self.negative[key] for key in negative_keys] + ([self.zero_count] if self.zero_count else [])
+                  + [self.positive[key] for key in positive_keys])
+        return np.array(values), np.array(counts, dtype=np.int64)
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float("nan")
+        values, counts = self._buckets()
+        ranks = np.asarray(q, dtype=np.float64) * (self.count - 1)
+        estimates = np.clip(values[np.searchsorted(np.cumsum(counts), ranks, side="right")], self.min, self.max)
+        return estimates if np.ndim(q) else float(estimates)
+
+    @property
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def mean_absolute_deviation(self, center: float) -> float:
+        # Mean of |x - center| over the bucket representatives
+        values, counts = self._buckets()
+        return float(np.dot(np.abs(values - center), counts) / self.count) if self.count else float("nan")
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": [list(self.positive.keys()), list(self.positive.values())],
+            "negative": [list(self.negative.keys()), list(self.negative.values())],
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, content: dict) -> "QuantileSketch":
+        sketch = cls(content["relative_accuracy"])
+        sketch.positive = dict(zip(*content["positive"]))
+        sketch.negative = dict(zip(*content["negative"]))
+        sketch.zero_count = content["zero_count"]
+        sketch.count = content["count"]
+        sketch.min = content["min"]
+        sketch.max = content["max"]
+        return sketch
+
+@dataclass
+class GroupState:
+    """
+    Serializable, mergeable summary of one group on one shard: running moments and an optional quantile
+    sketch for continuous metrics, or category counts for categorical ones. merge is associative, so shards
+    can be reduced in any order or tree shape before the merged states are turned into an experiment.
+    """
+    name: str
+    moments: RunningMoments = field(default_factory=RunningMoments)
+    counts: Optional[np.ndarray] = None
+    sketch: Optional[QuantileSketch] = None
+
+    @classmethod
+    def from_values(cls, name: str, values, categorical=False, sketch=True, relative_accuracy=0.01) -> "GroupState":
+        state = cls(name, counts=np.zeros(0, dtype=np.int64) if categorical else None,
+                    sketch=QuantileSketch(relative_accuracy) if sketch and not categorical else None)
+        state.update(values)
+        return state
+
+    @property
+    def categorical(self) -> bool:
+        return self.counts is not None
+
+    def update(self, values) -> None:
+        if self.categorical:
+            codes = np.asarray(values).ravel().astype(np.intp)
+            batch = np.bincount(codes, minlength=len(self.counts))
+            batch[:len(self.counts)] += self.counts
+            self.counts = batch
+            return
+        self.moments.update(values)
+        if self.sketch is not None:
+            self.sketch.add(values)
+
+    def merge(self, other: "GroupState") -> "GroupState":
+        if self.categorical != other.categorical:
+            raise ValueError(f"Cannot merge categorical and continuous states of group '{self.name}'")
+        counts = None
+        if self.categorical:
+            counts = np.zeros(max(len(self.counts), len(other.counts)), dtype=np.int64)
+            counts[:len(self.counts)] += self.counts
+            counts[:len(other.counts)] += other.counts
+        sketch = self.sketch.merge(other.sketch) if self.sketch is not None and other.sketch is not None else None
+        return GroupState(self.name, self.moments.merge(other.moments), counts, sketch)
+
+    def to_dict(self) -> dict:
+        m = self.moments
+        return {
+            "name": self.name,
+            "moments": [m.count, m.mean, m.m2, m.m3, m.m4],
+            "counts": self.counts.tolist() if self.categorical else None,
+            "sketch": self.sketch.to_dict() if self.sketch is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, content: dict) -> "GroupState":
+        return cls(
+            name=content["name"],
+            moments=RunningMoments(*content["moments"]),
+            counts=np.array(content["counts"], dtype=np.int64) if content["counts"] is not None else None,
+            sketch=QuantileSketch.from_dict(content["sketch"]) if content["sketch"] is not None else None
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text: str) -> "GroupState":
+        return cls.from_dict(json.loads(text))
+
+def merge_states(states: Sequence[GroupState]) -> GroupState:
+    # Pairwise tree reduction, as a reducer across shards would do it
+    states = list(states)
+    if not states:
+        raise ValueError("No states to merge")
+    while len(states) > 1:
+        states = [states[i].merge(states[i + 1]) if i + 1 < len(states) else states[i] for i in range(0, len(states), 2)]
+    return states[0]
+
+def merge_shards(shards: Sequence[Sequence[GroupState]]) -> List[GroupState]:
+    # Merges the states of each group across shards; every shard lists the same groups in the same order
+    return [merge_states(group_states) for group_states in zip(*shards)]
+
+def brown_forsythe_from_sketches(moments: Sequence[RunningMoments], sketches: Sequence[QuantileSketch]) -> Tuple[float, float]:
+    """
+    Brown-Forsythe test from mergeable state. The squared deviations from the median follow exactly from the
+    moments (M2 + n (mean - median)^2); the median and the mean absolute deviation come from the sketches,
+    so the result is approximate to the sketches' relative accuracy.
+    """
+    counts, means, m2s = [], [], []
+    for m, sketch in zip(moments, sketches):
+        median = sketch.median
+        mean_deviation = sketch.mean_absolute_deviation(median)
+        squared_deviations = m.m2 + m.count * (m.mean - median) ** 2
+        counts.append(m.count)
+        means.append(mean_deviation)
+        m2s.append(max(squared_deviations - m.count * mean_deviation ** 2, 0.0))
+    statistic, p_value = anova_from_moments(counts, means, m2s)
+    return float(statistic), float(p_value)
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+# Fields of ExperimentResults that are stored, plus the keys of each row
+RESULT_FIELDS = ("experiment_number", "sample_sizes", "statistic", "p_value", "effect_size", "confidence_interval",
+                 "bootstrap_mean_diff", "bootstrap_CI", "conclusion")
+KEY_FIELDS = ("key", "run_key", "config_key")
+DEFAULT_CHECKPOINT_EVERY = 10
+
+def hash_key(config: dict, chunks: Iterable[np.ndarray] = ()) -> str:
+    # SHA-256 of a JSON-serializable configuration and the raw bytes of the chunks
+    hasher = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode())
+    for chunk in chunks:
+        chunk = np.ascontiguousarray(chunk)
+        hasher.update(f"{chunk.dtype.str}{chunk.shape}".encode())
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _write_segment(path: str, rows: Sequence[dict]) -> None:
+    # One column per field; sample_sizes is ragged and stored flat with offsets
+    sizes = [len(row["sample_sizes"]) for row in rows]
+    columns = {name: np.array([row[name] for row in rows]) for name in KEY_FIELDS + ("conclusion",)}
+    columns.update(
+        experiment_number=np.array([row["experiment_number"] for row in rows], dtype=np.int64),
+        sample_sizes=np.array([size for row in rows for size in row["sample_sizes"]], dtype=np.int64),
+        sample_sizes_offsets=np.concatenate(([0], np.cumsum(sizes))).astype(np.int64),
+        **{name: np.array([row[name] for row in rows], dtype=np.float64)
+           for name in ("statistic", "p_value", "effect_size", "confidence_interval", "bootstrap_mean_diff", "bootstrap_CI")}
+    )
+    # Written under a temporary name and renamed, so readers never see a partial segment
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        np.savez_compressed(file, **columns)
+    os.replace(temporary, path)
+
+def _read_segment(path: str) -> List[dict]:
+    with np.load(path) as columns:
+        columns = {name: columns[name] for name in columns.files}
+    offsets = columns["sample_sizes_offsets"]
+    return [
+        {
+            **{name: str(columns[name][i]) for name in KEY_FIELDS + ("conclusion",)},
+            "experiment_number": int(columns["experiment_number"][i]),
+            "sample_sizes": columns["sample_sizes"][offsets[i]:offsets[i + 1]].tolist(),
+            **{name: float(columns[name][i]) for name in ("statistic", "p_value", "effect_size", "bootstrap_mean_diff")},
+            **{name: tuple(columns[name][i].tolist()) for name in ("confidence_interval", "bootstrap_CI")},
+        }
+        for i in range(len(columns["key"]))
+    ]
+
+class ResultStore:
+    """
+    Content-addressed store of repetition results in a directory of compressed columnar .npz segments.
+    Rows are keyed by a hash of the input data and the test configuration, and also indexed by a run key
+    derived from the repetition's position and seed, which lets a resumed run skip the fetch as well.
+    Every checkpoint writes a new segment atomically, so worker processes can checkpoint concurrently
+    and an interrupted run loses at most checkpoint_every - 1 repetitions.
+    """
+    def __init__(self, path: str, checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        os.makedirs(path, exist_ok=True)
+        self._rows: Dict[str, dict] = {}
+        self._runs: Dict[str, str] = {}
+        self._pending: List[dict] = []
+        self._segments = set()
+        self._counter = 0
+        self.refresh()
+
+    def refresh(self) -> None:
+        # Loads segments written since the last refresh, e.g. by worker processes
+        for name in sorted(os.listdir(self.path)):
+            if name.endswith(".npz") and name not in self._segments:
+                for row in _read_segment(os.path.join(self.path, name)):
+                    self._index(row)
+                self._segments.add(name)
+
+    def _index(self, row: dict) -> None:
+        self._rows[row["key"]] = row
+        if row["run_key"]:
+            self._runs[row["run_key"]] = row["key"]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._rows.get(key)
+
+    def get_run(self, run_key: str) -> Optional[dict]:
+        key = self._runs.get(run_key)
+        return self._rows[key] if key is not None else None
+
+    def put(self, row: dict) -> None:
+        self._index(row)
+        self._pending.append(row)
+        if len(self._pending) >= self.checkpoint_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        self._counter += 1
+        # Sortable by time; the process id keeps concurrent writers apart
+        name = f"{time.time_ns():020d}-{os.getpid()}-{self._counter}.npz"
+        _write_segment(os.path.join(self.path, name), self._pending)
+        self._segments.add(name)
+        self._pending = []
+
+    def compact(self) -> None:
+        # Rewrites all rows into one segment; only safe while no other process writes to the store
+        self.flush()
+        self.refresh()
+        old_segments = set(self._segments)
+        if len(old_segments) <= 1:
+            return
+        self._pending = list(self._rows.values())
+        self.flush()
+        for name in old_segments:
+            os.remove(os.path.join(self.path, name))
+        self._segments -= old_segments
+
+    def rows(self, config_key: Optional[str] = None, experiment_numbers: Optional[Iterable[int]] = None) -> List[dict]:
+        # Stored rows ordered by experiment number, optionally of one configuration and selected experiments only
+        numbers = set(experiment_numbers) if experiment_numbers is not None else None
+        selected = [row for row in self._rows.values()
+                    if (config_key is None or row["config_key"] == config_key) and (numbers is None or row["experiment_number"] in numbers)]
+        return sorted(selected, key=lambda row: row["experiment_number"])
+
+    def table(self, config_key: Optional[str] = None, experiment_numbers: Optional[Iterable[int]] = None) -> Dict[str, np.ndarray]:
+        # The same rows as columns for aggregation; the intervals are (rows, 2) arrays
+        rows = self.rows(config_key, experiment_numbers)
+        columns = {name: np.array([row[name] for row in rows]) for name in KEY_FIELDS + RESULT_FIELDS if name != "sample_sizes"}
+        # One list per row, since the number of groups may differ between configurations
+        columns["sample_sizes"] = np.empty(len(rows), dtype=object)
+        for i, row in enumerate(rows):
+            columns["sample_sizes"][i] = row["sample_sizes"]
+        return columns
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def __getstate__(self):
+        # A copy in a worker process writes its own segments; rows pending here stay with this instance
+        state = self.__dict__.copy()
+        state["_pending"] = []
+        return state
@@ -0,0 +1,124 @@
+import time
+import tracemalloc
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Dict, List, Optional
+
+# Phases recorded by the experiment pipeline; "test" includes "check_assumptions", "power" and "permutation"
+PHASES = ("fetch", "test", "check_assumptions", "power", "permutation", "bootstrap")
+NESTED_PHASES = ("check_assumptions", "power", "permutation")
+
+# Shared no-op context returned when instrumentation is disabled
+NO_PHASE = nullcontext()
+
+@dataclass
+class PhaseTimings:
+    experiment_index: int
+    durations: Dict[str, float] = field(default_factory=dict)
+    # Peak bytes traced by tracemalloc above the memory in use when the phase started; empty unless trace_memory is set
+    allocated_bytes: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total(self) -> float:
+        return sum(duration for phase, duration in self.durations.items() if phase not in NESTED_PHASES)
+
+    def __str__(self):
+        phases = ", ".join(f"{phase}={duration * 1000:.2f}ms" for phase, duration in self.durations.items())
+        return f"PhaseTimings(experiment {self.experiment_index + 1}: {phases})"
+
+PhaseHook = Callable[[str, PhaseTimings], None]
+PhaseWrapper = Callable[[str], ContextManager]
+
+class _Phase:
+    __slots__ = ("instrumentation", "name", "start", "start_memory", "peak_memory", "parent", "wrapped")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        instrumentation = self.instrumentation
+        self.wrapped = [wrapper(self.name) for wrapper in instrumentation.wrappers]
+        for context in self.wrapped:
+            context.__enter__()
+        self.parent = instrumentation._active
+        instrumentation._active = self
+        if instrumentation.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent.peak_memory = max(self.parent.peak_memory, peak)
+            tracemalloc.reset_peak()
+            self.start_memory = self.peak_memory = current
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start
+        instrumentation = self.instrumentation
+        timings = instrumentation.current
+        timings.durations[self.name] = timings.durations.get(self.name, 0.0) + duration
+        if instrumentation.trace_memory:
+            peak = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+            if self.parent is not None:
+                self.parent.peak_memory = max(self.parent.peak_memory, peak)
+            allocated = peak - self.start_memory
+            timings.allocated_bytes[self.name] = max(timings.allocated_bytes.get(self.name, 0), allocated)
+        instrumentation._active = self.parent
+        for context in reversed(self.wrapped):
+            context.__exit__(*exc_info)
+        for hook in instrumentation.hooks:
+            hook(self.name, timings)
+        return False
+
+class Instrumentation:
+    """
+    Records how long each phase of a repetition takes and optionally its allocations. Hooks are called
+    after every phase with the phase name and the timings of the current repetition, e.g. to export
+    metrics. Wrappers are factories of context managers entered around every phase, e.g. a profiler.
+    Hooks and wrappers stay in the process that registered them. Timings from worker processes are
+    replayed through the hooks once the worker returns them.
+    """
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.hooks: List[PhaseHook] = []
+        self.wrappers: List[PhaseWrapper] = []
+        self.history: List[PhaseTimings] = []
+        self.current = PhaseTimings(experiment_index=-1)
+        self._active: Optional[_Phase] = None
+
+    def add_hook(self, hook: PhaseHook) -> None:
+        self.hooks.append(hook)
+
+    def add_wrapper(self, wrapper: PhaseWrapper) -> None:
+        self.wrappers.append(wrapper)
+
+    def start(self, experiment_index: int) -> PhaseTimings:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.current = PhaseTimings(experiment_index=experiment_index)
+        self.history.append(self.current)
+        return self.current
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def replay(self, timings: PhaseTimings) -> None:
+        # Records timings measured elsewhere and passes every phase through the hooks
+        self.history.append(timings)
+        for phase in timings.durations:
+            for hook in self.hooks:
+                hook(phase, timings)
+
+    def summary(self) -> Dict[str, float]:
+        # Mean duration per phase over the recorded repetitions
+        totals: Dict[str, List[float]] = {}
+        for timings in self.history:
+            for phase, duration in timings.durations.items():
+                totals.setdefault(phase, []).append(duration)
+        return {phase: sum(durations) / len(durations) for phase, durations in totals.items()}
+
+    def __getstate__(self):
+        # Hooks and wrappers may hold unpicklable exporters or profilers, so workers only record
+        state = self.__dict__.copy()
+        state.update(hooks=[], wrappers=[], history=[], _active=None)
+        return state
@@ -1,66 +1,81 @@
 from dataclasses import dataclass
-from typing import Tuple
-from scipy import stats
-import statsmodels.stats.power as smp
-import numpy as np
+from typing import Optional, Tuple
 import logging
 import random
 from src.utils import Group, Experiment, CheckAssumptionsResult, TestResult
-from src.agent import generate_report
-
-# Configure logging to save results
-logging.basicConfig(filename='t_test_results.log', level=logging.INFO, format='%(asctime)s - %(message)s')
+from src.assumptions import status
+from src.sink import JsonLinesSink
+from src.power import default_power_analysis
+from src.metrics import MetricMatrixResult, ttest_matrix
+from src.moments import ttest_from_moments, cohens_d_from_moments, mean_difference_confidence_interval
+from src.agent import generate_report_async
+from src.permutation import PermutationResult, ttest_permutation
 
 @dataclass
 class TTestCheckAssumptionsResult(CheckAssumptionsResult):
     normality: dict
     variance_homogeneity: str
     variance_p: float
+    check_method: str = "exact"
 
 class TTestExperiment(Experiment):
     def check_assumptions(self) -> CheckAssumptionsResult:
-        data_arrays = [group.get_data_array() for group in self.groups]
-
-        # Normality Test (Shapiro-Wilk)
-        normality_results = {group.name: stats.shapiro(group.get_data_array()).pvalue for group in self.groups}
-
-        # Homogeneity of variance test
-        variance_pvalue = stats.levene(*data_arrays).pvalue
-
+        # Shapiro-Wilk and Levene, or their large-sample replacements (see Experiment.assumption_checks)
+        normality, variance_pvalue, mode = self.group_assumption_checks()
         return TTestCheckAssumptionsResult(
-            normality={name: "Pass" if p > 0.05 else "Fail" for name, p in normality_results.items()},
-            variance_homogeneity="Pass" if variance_pvalue > 0.05 else "Fail",
-            variance_p=round(variance_pvalue, 3)
+            normality=normality,
+            variance_homogeneity=status(variance_pvalue),
+            variance_p=round(float(variance_pvalue), 3),
+            check_method=mode
         )
 
     def calculate_effect_size(self) -> float:
-        data_arrays = [group.get_data_array() for group in self.groups]
-        
-        mean_diff = np.mean(data_arrays[0]) - np.mean(data_arrays[1])
-        pooled_std = np.sqrt((np.std(data_arrays[0], ddof=1) ** 2 + np.std(data_arrays[1], ddof=1) ** 2) / 2)
-        return round(mean_diff / pooled_std, 3) if pooled_std != 0 else 0
+        # Cohen's d from the group moments
+        m1, m2 = self.group_moments()[:2]
+        return round(float(cohens_d_from_moments(m1.mean, m1.variance, m2.mean, m2.variance)), 3)
 
     def calculate_confidence_interval(self) -> Tuple[float, float]:
-        data_arrays = [group.get_data_array() for group in self.groups]
-        
-        mean_diff = np.mean(data_arrays[0]) - np.mean(data_arrays[1])
-        se = np.sqrt(np.var(data_arrays[0], ddof=1) / len(data_arrays[0]) + np.var(data_arrays[1], ddof=1) / len(data_arrays[1]))
-        df = len(data_arrays[0]) + len(data_arrays[1]) - 2
-        t_critical = stats.t.ppf((1 + self.confidence) / 2, df)
-        margin_of_error = t_critical * se
-        return round(mean_diff - margin_of_error, 3), round(mean_diff + margin_of_error, 3)
+        m1, m2 = self.group_moments()[:2]
+        ci_lower, ci_upper = mean_difference_confidence_interval(m1.count, m1.mean, m1.variance, m2.count, m2.mean, m2.variance, self.confidence)
+        return round(float(ci_lower), 3), round(float(ci_upper), 3)
+
+    def permutation_test(self, num_permutations: Optional[int] = None, chunk_size=None, early_stopping=True,
+                         stop_significant=True) -> PermutationResult:
+        # Same pooled or Welch statistic as perform_test
+        a, b = self.data_arrays()[:2]
+        return ttest_permutation(a, b, equal_var=(self.assumptions().variance_homogeneity == "Pass"),
+                                 num_permutations=num_permutations or self.num_permutations, rng=self.rng, chunk_size=chunk_size,
+                                 alpha=self.alpha if early_stopping else None, stop_significant=stop_significant)
+
+    def perform_test_matrix(self, a, b, equal_var=None) -> MetricMatrixResult:
+        # Same test for every metric column of the (observations x metrics) arrays a and b
+        return ttest_matrix(a, b, alpha=self.alpha, confidence=self.confidence, equal_var=equal_var)
+
+    def interim_p_value(self) -> float:
+        m1, m2 = self.group_moments()[:2]
+        _, p_value = ttest_from_moments(m1.count, m1.mean, m1.variance, m2.count, m2.mean, m2.variance, equal_var=False)
+        return float(p_value)
 
     def perform_test(self) -> TestResult:
-        assumptions = self.check_assumptions()
-        data_arrays = [group.get_data_array() for group in self.groups]
+        with self.phase("check_assumptions"):
+            assumptions = self.assumptions()
+        m1, m2 = self.group_moments()[:2]
         required_sample_size = 0
 
-        t_stat, p_value = stats.ttest_ind(data_arrays[0], data_arrays[1], equal_var=(assumptions.variance_homogeneity == "Pass"))
+        t_stat, p_value = ttest_from_moments(m1.count, m1.mean, m1.variance, m2.count, m2.mean, m2.variance,
+                                             equal_var=(assumptions.variance_homogeneity == "Pass"))
+        inference = "parametric"
+        if self.use_permutation(assumptions):
+            with self.phase("permutation"):
+                # Only stops early above alpha, since small p-values may be corrected across repetitions afterwards
+                p_value = self.permutation_test(stop_significant=False).p_value
+            inference = "permutation"
         effect_size = self.calculate_effect_size()
-        if effect_size > 0:
+        if effect_size == 0:
             logging.warning("Effect size is zero. No additional samples needed.")
         else:
-            required_sample_size = smp.TTestIndPower().solve_power(effect_size=effect_size, alpha=self.alpha, power=self.power)
+            with self.phase("power"):
+                required_sample_size = default_power_analysis.sample_size(effect_size, alpha=self.alpha, target_power=self.power)
         confidence_interval = self.calculate_confidence_interval()
 
         conclusion = (
@@ -71,15 +86,16 @@ class TTestExperiment(Experiment):
 
         result = TestResult(
             test_type=self.test_type,
-            statistic=round(t_stat, 3),
-            p_value=round(p_value, 3),
+            statistic=round(float(t_stat), 3),
+            p_value=round(float(p_value), 3),
             effect_size=effect_size,
             required_sample_size_per_group=required_sample_size,
             confidence_interval=confidence_interval,
             conclusion=conclusion,
-            assumptions=assumptions
+            assumptions=assumptions,
+            inference=inference
         )
-        logging.info(result)
+        self.sink.emit("test_result", result)
         return result
 
 if __name__ == "__main__":
@@ -95,11 +111,15 @@ if __name__ == "__main__":
 
     num_experiments=10
     alpha=0.1 / num_experiments
-    experiment = TTestExperiment([group1, group2], "ttest", alpha=alpha)
+    sink = JsonLinesSink("t_test_results.jsonl")
+    experiment = TTestExperiment([group1, group2], "ttest", alpha=alpha, sink=sink)
     experiment_info = experiment.pre_register("Group B will have a higher average score than Group A")
     experiment_results, aggregated_experiment_results = experiment.run_experiment_multiple_times(fetch_data, num_experiments=num_experiments)
+    sink.close()
 
     summary_input = f"**Experiment Hypothesis:** {experiment_info.hypothesis}"
     summary_input += "\n\n**Experiment Results:**" + "\n\n".join(str(result) for result in experiment_results)
     summary_input += f"\n\n**Overall conclusion:**\n\n {aggregated_experiment_results.overall_conclusion}"
-    generate_report(summary_input)
+    # Report generation runs in the background; wait for it before exiting
+    report = generate_report_async(summary_input)
+    report.result()
@@ -1,10 +1,31 @@
 import numpy as np
-import logging
-from dataclasses import dataclass
-from typing import Tuple, List, Callable
+from scipy import stats
+import hashlib
+import marshal
+import math
+import mmap
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from dataclasses import asdict, dataclass, field
+from typing import Tuple, List, Callable, Optional, Mapping, Sequence, Union
+from src.bootstrap import bootstrap, Statistic
+from src.moments import RunningMoments
+from src.loaders import open_array
+from src.state import GroupState, QuantileSketch
+from src.correction import CORRECTION_METHODS, correct, corrected_alpha
+from src.sink import ResultSink, MemorySink, get_default_sink
+from src.timing import Instrumentation, PhaseTimings, NO_PHASE
+from src.assumptions import ASSUMPTION_CHECKS, SHAPIRO_MAX_SIZE, resolve_mode, group_checks, status
+from src.sequential import sequential_boundaries, conditional_power
+from src.permutation import INFERENCE_MODES, DEFAULT_NUM_PERMUTATIONS, PermutationResult
+from src.store import RESULT_FIELDS, ResultStore, hash_key
 
-# Configure logging to save results
-logging.basicConfig(filename='statistical_tests.log', level=logging.INFO, format='%(asctime)s - %(message)s')
+
+FETCH_MODES = ("point", "group", "experiment")
+# Values per chunk when moments are computed in chunked passes (8 MB of float64)
+DEFAULT_CHUNK_SIZE = 2 ** 20
 
 @dataclass
 class CheckAssumptionsResult:
@@ -20,25 +41,200 @@ class TestResult:
     confidence_interval: Tuple[float, float]
     conclusion: str
     assumptions: CheckAssumptionsResult
+    # "parametric" or "permutation", whichever the p-value comes from
+    inference: str = "parametric"
 
 @dataclass
 class BootstrapAnalysisResult:
     bootstrap_mean_diff: float
     bootstrap_CI: Tuple[float, float]
+    method: str = "percentile"
 
 class Group:
-    def __init__(self, name="Group"):
-        self.data = []
+    def __init__(self, name="Group", dtype=np.float64, capacity=64, streaming=False, sketch=False):
+        # A streaming group keeps only running moments (count, mean, M2, M3, M4) instead of the observations,
+        # plus a mergeable quantile sketch if sketch is set
         self.name = name
+        self.streaming = streaming
+        self.sketch = QuantileSketch() if streaming and sketch else None
+        self._buffer = np.empty(0 if streaming else max(int(capacity), 1), dtype=dtype)
+        self._size = 0
+        self._moments = RunningMoments()
+        # Set while the group is attached to read-only, typically memory-mapped, data
+        self.attached = False
+        # Bumped on every mutation so that experiments can tell when cached results are stale
+        self.version = 0
+
+    @classmethod
+    def from_file(cls, path: str, name: Optional[str] = None, dtype=np.float64) -> "Group":
+        # Memory-maps a .npy file (or raw binary of dtype) without reading it; see src.loaders for CSV files
+        values = open_array(path, dtype)
+        group = cls(name=name or os.path.splitext(os.path.basename(path))[0], dtype=values.dtype, capacity=1)
+        group.attach(values)
+        return group
+
+    @classmethod
+    def from_moments(cls, name: str, moments: RunningMoments) -> "Group":
+        # A streaming group that starts from precomputed moments
+        group = cls(name=name, streaming=True)
+        group._moments = RunningMoments(moments.count, moments.mean, moments.m2, moments.m3, moments.m4)
+        return group
+
+    @classmethod
+    def from_state(cls, state: GroupState) -> "Group":
+        # Group from a (merged) shard state; categorical states go to ChiSquaredExperiment.from_states instead
+        if state.categorical:
+            raise ValueError(f"State of group '{state.name}' holds category counts; use ChiSquaredExperiment.from_states")
+        group = cls.from_moments(state.name, state.moments)
+        group.sketch = state.sketch.merge(QuantileSketch(state.sketch.relative_accuracy)) if state.sketch is not None else None
+        return group
+
+    def to_state(self, categorical=False, sketch=True) -> GroupState:
+        # Mergeable state of this group, e.g. to ship one shard's summary to a reducer
+        if self.streaming:
+            if categorical:
+                raise ValueError(f"Group '{self.name}' is streaming and keeps no category codes")
+            m = self._moments
+            return GroupState(self.name, RunningMoments(m.count, m.mean, m.m2, m.m3, m.m4),
+                              sketch=self.sketch.merge(QuantileSketch(self.sketch.relative_accuracy)) if self.sketch is not None else None)
+        state = GroupState(self.name, counts=np.zeros(0, dtype=np.int64) if categorical else None,
+                           sketch=QuantileSketch() if sketch and not categorical else None)
+        for chunk in self.iter_chunks():
+            state.update(chunk)
+        return state
+
+    @classmethod
+    def from_summary(cls, name: str, count: int, mean: float, variance: float,
+                     skewness: Optional[float] = None, kurtosis: Optional[float] = None) -> "Group":
+        """
+        Group defined by its sufficient statistics: count, mean and sample variance (ddof=1).
+        Skewness and excess kurtosis (biased, as scipy.stats.skew/kurtosis) are optional and only used
+        by the normality check, which is skipped without them.
+        """
+        m2 = variance * (count - 1)
+        m3 = skewness * count * (m2 / count) ** 1.5 if skewness is not None else float("nan")
+        m4 = (kurtosis + 3) * count * (m2 / count) ** 2 if kurtosis is not None else float("nan")
+        return cls.from_moments(name, RunningMoments(int(count), float(mean), float(m2), float(m3), float(m4)))
+
+    def attach(self, values: np.ndarray) -> None:
+        # Uses the array as the group's data without copying; the group is read-only until cleared
+        if self.streaming:
+            raise ValueError(f"Group '{self.name}' is streaming and cannot be attached to an array")
+        self._buffer = values
+        self._size = len(values)
+        self.attached = True
+        self.version += 1
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        buffer = self._buffer
+        if isinstance(buffer, np.memmap) and isinstance(buffer.base, mmap.mmap) and buffer.filename:
+            # Sent to worker processes as the file location, which is mapped again on unpickling
+            state["_buffer"] = (buffer.filename, buffer.offset, buffer.dtype, buffer.shape)
+        return state
+
+    def __setstate__(self, state):
+        if isinstance(state["_buffer"], tuple):
+            filename, offset, dtype, shape = state["_buffer"]
+            state["_buffer"] = np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape)
+        self.__dict__.update(state)
+
+    @property
+    def memory_mapped(self) -> bool:
+        return isinstance(self._buffer, np.memmap) or isinstance(getattr(self._buffer, "base", None), np.memmap)
+
+    @property
+    def in_memory(self) -> bool:
+        return not self.streaming and not self.memory_mapped
+
+    def iter_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        # Read-only views of consecutive chunks; for memory-mapped data only one chunk is paged in at a time
+        data = self.get_data_array()
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    @property
+    def dtype(self):
+        return self._buffer.dtype
+
+    @property
+    def data(self):
+        return self.get_data_array()
+
+    @property
+    def moments(self) -> RunningMoments:
+        if self.streaming:
+            return self._moments
+        return RunningMoments.from_chunks(self.iter_chunks())
+
+    def _reserve(self, size):
+        # Grow by doubling so that appends are amortized O(1)
+        capacity = len(self._buffer)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        buffer = np.empty(capacity, dtype=self._buffer.dtype)
+        buffer[:self._size] = self._buffer[:self._size]
+        self._buffer = buffer
+
+    def _check_writable(self):
+        if self.attached:
+            raise ValueError(f"Group '{self.name}' is attached to read-only data; clear() it before adding data")
 
     def add_data(self, value):
-        self.data.append(value)
+        self._check_writable()
+        self.version += 1
+        if self.streaming:
+            self._moments.add(float(value))
+            if self.sketch is not None:
+                self.sketch.add(value)
+            return
+        self._reserve(self._size + 1)
+        self._buffer[self._size] = value
+        self._size += 1
+
+    def extend(self, values):
+        if not hasattr(values, "__len__"):
+            values = list(values)
+        self._check_writable()
+        values = np.asarray(values, dtype=self._buffer.dtype).ravel()
+        self.version += 1
+        if self.streaming:
+            self._moments.update(values)
+            if self.sketch is not None:
+                self.sketch.add(values)
+            return
+        self._reserve(self._size + len(values))
+        self._buffer[self._size:self._size + len(values)] = values
+        self._size += len(values)
+
+    def clear(self):
+        self.version += 1
+        self._size = 0
+        if self.attached:
+            # Detach from the file and start over with an in-memory buffer
+            self._buffer = np.empty(64, dtype=self._buffer.dtype)
+            self.attached = False
+        self._moments = RunningMoments()
+        if self.sketch is not None:
+            self.sketch = QuantileSketch(self.sketch.relative_accuracy)
 
     def get_data_array(self):
-        return np.array(self.data)
+        if self.streaming:
+            raise ValueError(f"Group '{self.name}' is streaming and keeps no raw observations")
+        # Read-only view of the filled region, no copy
+        view = self._buffer[:self._size]
+        view.flags.writeable = False
+        return view
+
+    def __len__(self):
+        return self._moments.count if self.streaming else self._size
 
     def __str__(self):
-        return f"{self.name}: {self.data}"
+        if self.streaming:
+            return f"{self.name}: n={self._moments.count}, mean={self._moments.mean}, variance={self._moments.variance}"
+        return f"{self.name}: {self.get_data_array().tolist()}"
     
 @dataclass
 class ExperimentInfo:
@@ -71,6 +267,15 @@ class ExperimentResults:
     bootstrap_mean_diff: float
     bootstrap_CI: Tuple[float, float]
     conclusion: str
+    timings: Optional[PhaseTimings] = None
+
+    def to_row(self) -> dict:
+        # The fields kept in a ResultStore; timings describe one run and are not stored
+        return {name: getattr(self, name) for name in RESULT_FIELDS}
+
+    @classmethod
+    def from_row(cls, row: dict, experiment_number: int) -> "ExperimentResults":
+        return cls(**{**{name: row[name] for name in RESULT_FIELDS}, "experiment_number": experiment_number})
 
     def __str__(self):
         return (f"ExperimentResults:\n"
@@ -90,17 +295,56 @@ class AggregatedExperimentResults:
     significant_results: int
     num_experiments: int
     overall_conclusion: str
+    correction_method: str = "bonferroni"
+    adjusted_p_values: List[float] = field(default_factory=list)
 
     def __str__(self
                 ):
         return (f"AggregatedExperimentResults:\n"
                 f"  Bonferroni Corrected Alpha: {self.bonferroni_corrected_alpha}\n"
+                f"  Correction Method: {self.correction_method}\n"
+                f"  Adjusted P-values: {self.adjusted_p_values}\n"
                 f"  Significant Results: {self.significant_results}\n"
                 f"  Number of Experiments: {self.num_experiments}\n"
                 f"  Overall Conclusion: {self.overall_conclusion}")
 
+@dataclass
+class SequentialLook:
+    look: int
+    sample_sizes: List[int]
+    information_fraction: float
+    z_statistic: float
+    z_boundary: float
+    p_value: float
+    nominal_alpha: float
+    conditional_power: float
+    decision: str
+
+@dataclass
+class SequentialTestResult:
+    looks: List[SequentialLook]
+    stopped_early: bool
+    stop_reason: str
+    sample_sizes: List[int]
+    final_result: TestResult
+    conclusion: str
+
+    def __str__(self):
+        looks = "\n".join(f"    Look {look.look}: n={look.sample_sizes}, z={look.z_statistic:.3f}, "
+                          f"boundary={look.z_boundary:.3f}, p={look.p_value:.5f}, decision={look.decision}"
+                          for look in self.looks)
+        return (f"SequentialTestResult:\n"
+                f"  Looks:\n{looks}\n"
+                f"  Stopped Early: {self.stopped_early}\n"
+                f"  Stop Reason: {self.stop_reason}\n"
+                f"  Sample Sizes: {self.sample_sizes}\n"
+                f"  Conclusion: {self.conclusion}")
+
 class Experiment:
-    def __init__(self, groups: List[Group], test_type: str, alpha=0.05, power=0.8, confidence=0.95, bootstrap_confidence=0.95, correct_alpha=False, num_experiments=1):
+    def __init__(self, groups: List[Group], test_type: str, alpha=0.05, power=0.8, confidence=0.95, bootstrap_confidence=0.95, correct_alpha=False, num_experiments=1, seed=None, correction="bonferroni",
+                 sink: Optional[ResultSink] = None, verbose=True, instrumentation: Optional[Instrumentation] = None,
+                 assumption_checks="auto", assumption_sample_size=SHAPIRO_MAX_SIZE, reuse_assumptions=False, inference="parametric",
+                 num_permutations=DEFAULT_NUM_PERMUTATIONS):
         self.groups = groups
         self.test_type = test_type
         self.alpha = alpha
@@ -108,6 +352,150 @@ class Experiment:
         self.confidence = confidence
         self.bootstrap_confidence = bootstrap_confidence
         self.num_experiments = num_experiments
+        if correction not in CORRECTION_METHODS:
+            raise ValueError(f"Unknown correction method '{correction}', expected one of {CORRECTION_METHODS}")
+        self.correction = correction
+        # Records go to the given sink or to the configured default one; verbose controls printing to stdout
+        self._sink = sink
+        self.verbose = verbose
+        # Per-phase timings of each repetition; None disables them
+        self.instrumentation = instrumentation
+        # How assumptions are checked (see src.assumptions); with reuse_assumptions the first repetition's checks are kept
+        if assumption_checks not in ASSUMPTION_CHECKS:
+            raise ValueError(f"Unknown assumption check mode '{assumption_checks}', expected one of {ASSUMPTION_CHECKS}")
+        self.assumption_checks = assumption_checks
+        self.assumption_sample_size = assumption_sample_size
+        self.reuse_assumptions = reuse_assumptions
+        self._assumptions = None
+        # Where p-values come from (see src.permutation); permutations are drawn from self.rng
+        if inference not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode '{inference}', expected one of {INFERENCE_MODES}")
+        self.inference = inference
+        self.num_permutations = num_permutations
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self._cache = {}
+        self._cache_key = None
+
+    @property
+    def sink(self) -> ResultSink:
+        return self._sink if self._sink is not None else get_default_sink()
+
+    @sink.setter
+    def sink(self, sink: Optional[ResultSink]):
+        self._sink = sink
+
+    def __getstate__(self):
+        # Sinks may own threads and files, so they are not sent to worker processes
+        state = self.__dict__.copy()
+        state["_sink"] = None
+        return state
+
+    def _report(self, experiment_results: ExperimentResults) -> None:
+        self.sink.emit("experiment_results", experiment_results)
+        if self.verbose:
+            print(experiment_results)
+
+    def phase(self, name: str):
+        # Context manager timing one phase of the current repetition
+        if self.instrumentation is None:
+            return NO_PHASE
+        return self.instrumentation.phase(name)
+
+    @classmethod
+    def from_states(cls, states: Sequence[GroupState], test_type: str, **kwargs) -> "Experiment":
+        # Experiment on merged shard states, one per group (see src.state.merge_shards)
+        return cls([Group.from_state(state) for state in states], test_type, **kwargs)
+
+    @classmethod
+    def from_summaries(cls, summaries: Mapping[str, Union[RunningMoments, Sequence[float]]], test_type: str, **kwargs) -> "Experiment":
+        # One group per entry, given as RunningMoments or (count, mean, variance[, skewness, kurtosis])
+        groups = [Group.from_moments(name, summary) if isinstance(summary, RunningMoments) else Group.from_summary(name, *summary)
+                  for name, summary in summaries.items()]
+        return cls(groups, test_type, **kwargs)
+
+    def data_version(self) -> tuple:
+        return tuple((id(group), group.version) for group in self.groups)
+
+    def cached(self, name: str, compute: Callable):
+        # Per-run cache shared by all methods, dropped as soon as any group is mutated
+        key = self.data_version()
+        if key != self._cache_key:
+            self._cache = {}
+            self._cache_key = key
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    def data_arrays(self) -> List[np.ndarray]:
+        return self.cached("data_arrays", lambda: [group.get_data_array() for group in self.groups])
+
+    def group_moments(self) -> List[RunningMoments]:
+        return self.cached("group_moments", lambda: [group.moments for group in self.groups])
+
+    def assumption_check_mode(self) -> str:
+        return resolve_mode(self.assumption_checks, [len(group) for group in self.groups], self.assumption_sample_size,
+                            streaming=any(group.streaming for group in self.groups))
+
+    def group_assumption_checks(self) -> Tuple[dict, float, str]:
+        # Per-group normality status, the variance homogeneity p-value and the mode used
+        mode = self.assumption_check_mode()
+        # Groups that are not in memory are checked from their moments alone (Bartlett instead of Brown-Forsythe's median pass)
+        out_of_memory = not all(group.in_memory for group in self.groups)
+        data_arrays = None if mode == "skip" or (out_of_memory and mode == "moments") else self.data_arrays()
+        sketches = [group.sketch for group in self.groups]
+        normality_p, variance_p = group_checks(mode, data_arrays, self.group_moments(), self.assumption_sample_size,
+                                               sketches if all(sketch is not None for sketch in sketches) else None)
+        return {group.name: status(p) for group, p in zip(self.groups, normality_p)}, variance_p, mode
+
+    def assumptions(self) -> CheckAssumptionsResult:
+        # check_assumptions once per run, or once for all repetitions with reuse_assumptions
+        if self.reuse_assumptions:
+            if self._assumptions is None:
+                self._assumptions = self.check_assumptions()
+            return self._assumptions
+        return self.cached("assumptions", self.check_assumptions)
+
+    def result_config(self) -> dict:
+        # Settings that change the results of a repetition; part of every ResultStore key
+        return {
+            "experiment": type(self).__qualname__,
+            "test_type": self.test_type,
+            "groups": [group.name for group in self.groups],
+            "alpha": self.alpha,
+            "power": self.power,
+            "confidence": self.confidence,
+            "bootstrap_confidence": self.bootstrap_confidence,
+            "assumption_checks": self.assumption_checks,
+            "assumption_sample_size": self.assumption_sample_size,
+            "reuse_assumptions": self.reuse_assumptions,
+            "inference": self.inference,
+            "num_permutations": self.num_permutations,
+        }
+
+    def config_key(self) -> str:
+        return hash_key(self.result_config())
+
+    def content_chunks(self):
+        # Everything the test reads, hashed into the content key of a repetition
+        for group in self.groups:
+            if group.streaming:
+                m = group.moments
+                yield np.array([m.count, m.mean, m.m2, m.m3, m.m4])
+            else:
+                yield from group.iter_chunks()
+
+    def use_permutation(self, assumptions: CheckAssumptionsResult) -> bool:
+        # Permutations need the observations in memory, so streaming and memory-mapped groups stay parametric
+        if self.inference == "parametric" or not all(group.in_memory for group in self.groups):
+            return False
+        return self.inference == "permutation" or "Fail" in assumptions.normality.values()
+
+    def permutation_test(self, num_permutations: Optional[int] = None, chunk_size=None, early_stopping=True,
+                         stop_significant=True) -> PermutationResult:
+        # Permutation p-value of the test statistic; early stopping ends the test once it is decided relative to alpha
+        # (see src.permutation.permutation_test for stop_significant)
+        raise NotImplementedError(f"{type(self).__name__} does not support permutation tests")
 
     def check_assumptions(self) -> CheckAssumptionsResult:
         # TODO: Implement this method
@@ -125,6 +513,10 @@ class Experiment:
         # TODO: Implement this method
         return None
 
+    def interim_p_value(self) -> float:
+        # Unrounded two-sided p-value on the data collected so far, used by sequential testing
+        raise NotImplementedError(f"{type(self).__name__} does not support sequential testing")
+
     def pre_register(self, hypothesis: str) -> None:
         experiment_info = ExperimentInfo(
             groups=[group.name for group in self.groups],
@@ -135,76 +527,285 @@ class Experiment:
             bootstrap_confidence=self.bootstrap_confidence,
             hypothesis=hypothesis
         )
-        logging.info(f"Pre-registered experiment: \n{experiment_info}")
-        print(f"Experiment pre-registered: \n{experiment_info}")
+        self.sink.emit("pre_registration", experiment_info)
+        if self.verbose:
+            print(f"Experiment pre-registered: \n{experiment_info}")
         return experiment_info
 
-    def bootstrap_analysis(self, num_bootstraps=1000) -> BootstrapAnalysisResult:
-        data_arrays = [group.get_data_array() for group in self.groups]
-        boot_diffs = []
-        for _ in range(num_bootstraps):
-            boot_samples = [np.random.choice(data, size=len(data), replace=True) for data in data_arrays]
-            boot_diffs.append(np.mean(boot_samples[0]) - np.mean(boot_samples[1]))
+    def bootstrap_analysis(self, num_bootstraps=1000, statistic: Optional[Statistic] = None, method="percentile", chunk_size=None) -> BootstrapAnalysisResult:
+        # Defaults to the mean difference of two groups, or the range of group means for k groups
+        result = bootstrap(self.data_arrays(), statistic=statistic, num_bootstraps=num_bootstraps, confidence=self.bootstrap_confidence,
+                           method=method, rng=self.rng, chunk_size=chunk_size)
 
-        ci_lower, ci_upper = np.percentile(boot_diffs, [(1-self.bootstrap_confidence)/2*100, (1+self.bootstrap_confidence)/2*100])
+        ci_lower, ci_upper = result.confidence_interval
         return BootstrapAnalysisResult(
-            bootstrap_mean_diff=float(np.mean(boot_diffs)),
-            bootstrap_CI=(round(ci_lower, 3), round(ci_upper, 3))
+            bootstrap_mean_diff=result.bootstrap_mean,
+            bootstrap_CI=(round(ci_lower, 3), round(ci_upper, 3)),
+            method=method
         )
     
-    def aggregate_results(self, p_values: List[float], num_experiments: int) -> AggregatedExperimentResults:
-        # Bonferroni Correction
-        bonferroni_corrected_alpha = 1 - (1 - self.alpha) ** num_experiments
+    def aggregate_results(self, p_values: List[float], num_experiments: int, correction: Optional[str] = None) -> AggregatedExperimentResults:
+        # Multiple-comparison correction across the repetitions (bonferroni, sidak, holm, hochberg, bh or by)
+        correction = correction or self.correction
+        bonferroni_corrected_alpha = corrected_alpha(self.alpha, num_experiments, "bonferroni")
+        corrected = correct(p_values, self.alpha, correction)
 
         # Determine if overall result is significant
-        significant_results = sum(1 for p in p_values if p < bonferroni_corrected_alpha)
+        significant_results = corrected.num_rejected
         overall_conclusion = "Significant" if significant_results > 0 else "Not Significant"
 
         aggregated_results = AggregatedExperimentResults(
             bonferroni_corrected_alpha=bonferroni_corrected_alpha,
             significant_results=significant_results,
             num_experiments=num_experiments,
-            overall_conclusion=overall_conclusion
+            overall_conclusion=overall_conclusion,
+            correction_method=correction,
+            adjusted_p_values=[round(float(p), 5) for p in corrected.adjusted_p_values]
         )
 
-        print(f"\nBonferroni Corrected Alpha: {bonferroni_corrected_alpha:.5f}")
-        print(f"Number of significant results: {significant_results}/{num_experiments}")
-        print(f"Overall Conclusion: {overall_conclusion}")
+        if self.verbose:
+            print(f"\nBonferroni Corrected Alpha: {bonferroni_corrected_alpha:.5f}")
+            print(f"Number of significant results ({correction}): {significant_results}/{num_experiments}")
+            print(f"Overall Conclusion: {overall_conclusion}")
 
-        # Logging results
-        logging.info(aggregated_results)
+        self.sink.emit("aggregated_results", aggregated_results)
 
         return aggregated_results
 
-    def run_experiment_multiple_times(self, fetch_data: Callable[[str, int], float], num_experiments=5, num_data_points=100) -> None:
-        p_values = []
-        experiment_results_list = []
-        for i in range(num_experiments):
+    def load_experiment_data(self, fetch_data: Callable, experiment_index: int, num_data_points=100, fetch_mode="point", append=False) -> None:
+        # "point":      fetch_data(group_name, i) -> value, called once per data point and group
+        # "group":      fetch_data(group_name, i, num_data_points) -> array with all points of one group
+        # "experiment": fetch_data(i, num_data_points) -> {group_name: array} or one array per group, in group order
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode '{fetch_mode}', expected one of {FETCH_MODES}")
+        if not append:
             for group in self.groups:
-                group.data.clear()
+                group.clear()
+
+        if fetch_mode == "point":
             for _ in range(num_data_points):
                 for group in self.groups:
-                    group.add_data(fetch_data(group.name, i))
+                    group.add_data(fetch_data(group.name, experiment_index))
+        elif fetch_mode == "group":
+            for group in self.groups:
+                group.extend(fetch_data(group.name, experiment_index, num_data_points))
+        else:
+            batch = fetch_data(experiment_index, num_data_points)
+            if isinstance(batch, Mapping):
+                batch = [batch[group.name] for group in self.groups]
+            if len(batch) != len(self.groups):
+                raise ValueError(f"Expected data for {len(self.groups)} groups, got {len(batch)}")
+            for group, values in zip(self.groups, batch):
+                group.extend(values)
 
+    def run_sequential(self, fetch_data: Callable, max_data_points=100, looks=5, spending="obrien_fleming",
+                       futility_threshold: Optional[float] = 0.1, fetch_mode="point", experiment_index=0) -> SequentialTestResult:
+        # looks: number of equally spaced looks, or the cumulative data points per group at each look
+        if isinstance(looks, int):
+            looks = [math.ceil(max_data_points * (k + 1) / looks) for k in range(looks)]
+        looks = list(looks)
+        if looks[-1] != max_data_points:
+            raise ValueError("The last look must be at max_data_points")
+        fractions = np.array(looks) / max_data_points
+        boundaries = sequential_boundaries(fractions, self.alpha, spending)
+
+        for group in self.groups:
+            group.clear()
+        collected = 0
+        sequential_looks = []
+        stop_reason = None
+        for k, (num_points, fraction, boundary) in enumerate(zip(looks, fractions, boundaries)):
+            self.load_experiment_data(fetch_data, experiment_index, num_points - collected, fetch_mode, append=True)
+            collected = num_points
+
+            p_value = self.interim_p_value()
+            z_statistic = float(stats.norm.isf(p_value / 2))
+            power = conditional_power(z_statistic, fraction, boundaries[-1])
+            if z_statistic >= boundary:
+                decision = stop_reason = "efficacy"
+            elif k < len(looks) - 1 and futility_threshold is not None and power < futility_threshold:
+                decision = stop_reason = "futility"
+            else:
+                decision = "continue"
+
+            sequential_looks.append(SequentialLook(
+                look=k + 1,
+                sample_sizes=[len(group) for group in self.groups],
+                information_fraction=float(fraction),
+                z_statistic=z_statistic,
+                z_boundary=float(boundary),
+                p_value=p_value,
+                nominal_alpha=float(2 * stats.norm.sf(boundary)),
+                conditional_power=power,
+                decision=decision
+            ))
+            if stop_reason is not None:
+                break
+
+        conclusion = (
+            "Reject the null hypothesis: Boundary crossed at an interim or final look."
+            if stop_reason == "efficacy" else
+            "Fail to reject the null hypothesis: No boundary crossed."
+        )
+        result = SequentialTestResult(
+            looks=sequential_looks,
+            stopped_early=stop_reason is not None and len(sequential_looks) < len(looks),
+            stop_reason=stop_reason,
+            sample_sizes=[len(group) for group in self.groups],
+            final_result=self.perform_test(),
+            conclusion=conclusion
+        )
+        self.sink.emit("sequential_result", result)
+        return result
+
+    def run_single_experiment(self, fetch_data: Callable, experiment_index: int, num_data_points=100, fetch_mode="point",
+                              seed_sequence: Optional[np.random.SeedSequence] = None, store: Optional[ResultStore] = None,
+                              run_id: Optional[str] = None) -> ExperimentResults:
+        if seed_sequence is not None:
+            self.rng = np.random.default_rng(seed_sequence)
+        if store is not None:
+            # Bootstrap and permutations draw from the seed, so it is part of both keys
+            seed = seed_sequence if seed_sequence is not None else self.seed_sequence
+            config = {"config": self.result_config(), "seed": [seed.entropy, list(seed.spawn_key)]}
+            # A repetition computed before is found without fetching its data again, but only if the data source can be identified
+            source = run_id if run_id is not None else _source_id(fetch_data)
+            # With reuse_assumptions the results also depend on the kept checks, which the first repetition computes from its data
+            pending_assumptions = self.reuse_assumptions and self._assumptions is None
+            run_key = self._run_key(config, source, experiment_index, num_data_points, fetch_mode) if not pending_assumptions else ""
+            if run_key:
+                row = store.get_run(run_key)
+                if row is not None:
+                    return ExperimentResults.from_row(row, experiment_index + 1)
+        timings = self.instrumentation.start(experiment_index) if self.instrumentation is not None else None
+        with self.phase("fetch"):
+            self.load_experiment_data(fetch_data, experiment_index, num_data_points, fetch_mode)
+
+        if store is not None:
+            if pending_assumptions:
+                self.assumptions()
+                run_key = self._run_key(config, source, experiment_index, num_data_points, fetch_mode)
+            # The same data under the same configuration and seed gives the same results
+            key = hash_key({**config, **self._reused_assumptions(), "sizes": [len(group) for group in self.groups]}, self.content_chunks())
+            row = store.get(key)
+            if row is not None:
+                if run_key:
+                    store.put({**row, "run_key": run_key})
+                return ExperimentResults.from_row(row, experiment_index + 1)
+
+        with self.phase("test"):
             results = self.perform_test()
-            confidence_interval = self.calculate_confidence_interval()
-            bootstrap_results = self.bootstrap_analysis()
-            p_values.append(results.p_value)
-
-            experiment_results = ExperimentResults(
-                experiment_number=i + 1,
-                sample_sizes=[len(group.data) for group in self.groups],
-                statistic=results.statistic,
-                p_value=results.p_value,
-                effect_size=results.effect_size,
-                confidence_interval=confidence_interval,
-                bootstrap_mean_diff=bootstrap_results.bootstrap_mean_diff,
-                bootstrap_CI=bootstrap_results.bootstrap_CI,
-                conclusion=results.conclusion
-            )
-            print(experiment_results)
-            experiment_results_list.append(experiment_results)
+        confidence_interval = results.confidence_interval
+        if not all(group.in_memory for group in self.groups):
+            # Resampling needs the raw observations in memory
+            bootstrap_results = BootstrapAnalysisResult(float("nan"), (float("nan"), float("nan")), method="skipped")
+        else:
+            with self.phase("bootstrap"):
+                bootstrap_results = self.bootstrap_analysis()
+
+        experiment_results = ExperimentResults(
+            experiment_number=experiment_index + 1,
+            sample_sizes=[len(group) for group in self.groups],
+            statistic=results.statistic,
+            p_value=results.p_value,
+            effect_size=results.effect_size,
+            confidence_interval=confidence_interval,
+            bootstrap_mean_diff=bootstrap_results.bootstrap_mean_diff,
+            bootstrap_CI=bootstrap_results.bootstrap_CI,
+            conclusion=results.conclusion,
+            timings=timings
+        )
+        if store is not None:
+            store.put({**experiment_results.to_row(), "key": key, "run_key": run_key, "config_key": hash_key(config["config"])})
+        return experiment_results
+
+    def run_experiment_multiple_times(self, fetch_data: Callable, num_experiments=5, num_data_points=100, fetch_mode="point",
+                                      num_workers=1, chunksize=None, correction: Optional[str] = None,
+                                      store: Optional[ResultStore] = None, run_id: Optional[str] = None) -> Tuple[List[ExperimentResults], AggregatedExperimentResults]:
+        # Every repetition gets its own child seed, so results do not depend on num_workers
+        # With a store, repetitions computed before are skipped and progress is checkpointed to it;
+        # run_id names the data source, which otherwise is identified by pickling fetch_data (see _source_id)
+        if store is not None and run_id is None:
+            run_id = _source_id(fetch_data)
+        seed_sequences = self.seed_sequence.spawn(num_experiments)
+        tasks = list(enumerate(seed_sequences))
+
+        if num_workers == 1:
+            experiment_results_list = []
+            for i, seed_sequence in tasks:
+                experiment_results = self.run_single_experiment(fetch_data, i, num_data_points, fetch_mode, seed_sequence, store, run_id)
+                self._report(experiment_results)
+                experiment_results_list.append(experiment_results)
+        else:
+            # fetch_data and the experiment are pickled to the workers, so fetch_data must be a module-level function
+            num_workers = num_workers or os.cpu_count()
+            chunksize = chunksize or max(1, math.ceil(num_experiments / (num_workers * 4)))
+            chunks = [tasks[start:start + chunksize] for start in range(0, num_experiments, chunksize)]
+            if self.reuse_assumptions and self._assumptions is None:
+                # Each worker would keep the checks of the first repetition it runs, so those of repetition 0 are computed here
+                self.load_experiment_data(fetch_data, 0, num_data_points, fetch_mode)
+                self.assumptions()
+            if store is not None:
+                store.flush()
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                batches = executor.map(_run_experiment_batch, repeat(self), repeat(fetch_data), chunks,
+                                       repeat(num_data_points), repeat(fetch_mode), repeat(store), repeat(run_id))
+                experiment_results_list = []
+                for batch_results, records in batches:
+                    # Records emitted in the workers are replayed into this process' sink
+                    for kind, record in records:
+                        self.sink.emit(kind, record)
+                    for experiment_results in batch_results:
+                        if self.instrumentation is not None and experiment_results.timings is not None:
+                            self.instrumentation.replay(experiment_results.timings)
+                        self._report(experiment_results)
+                        experiment_results_list.append(experiment_results)
+            if store is not None:
+                # Picks up the segments the workers wrote
+                store.refresh()
+        if store is not None:
+            store.flush()
 
         # Call the aggregate_results method
-        aggregated_results = self.aggregate_results(p_values, num_experiments)
-        return experiment_results_list, aggregated_results
\ No newline at end of file
+        p_values = [experiment_results.p_value for experiment_results in experiment_results_list]
+        aggregated_results = self.aggregate_results(p_values, num_experiments, correction)
+        return experiment_results_list, aggregated_results
+
+    def _reused_assumptions(self) -> dict:
+        # The checks kept with reuse_assumptions, as part of the store keys
+        if not self.reuse_assumptions:
+            return {}
+        return {"assumptions": asdict(self._assumptions) if self._assumptions is not None else None}
+
+    def _run_key(self, config: dict, source: Optional[str], experiment_index: int, num_data_points: int, fetch_mode: str) -> str:
+        # Key of a repetition by its position in a run of an identified data source; "" when the source is unknown
+        if source is None:
+            return ""
+        return hash_key({**config, **self._reused_assumptions(), "source": source, "experiment_index": experiment_index,
+                         "num_data_points": num_data_points, "fetch_mode": fetch_mode})
+
+def _run_experiment_batch(experiment: Experiment, fetch_data: Callable, tasks: List[Tuple[int, np.random.SeedSequence]],
+                          num_data_points: int, fetch_mode: str, store: Optional[ResultStore] = None,
+                          run_id: Optional[str] = None) -> Tuple[List[ExperimentResults], List[Tuple[str, object]]]:
+    # Runs in a worker process on its own copy of the experiment and its groups; a store copy checkpoints to its own segments
+    experiment.sink = MemorySink()
+    results = [experiment.run_single_experiment(fetch_data, i, num_data_points, fetch_mode, seed_sequence, store, run_id)
+               for i, seed_sequence in tasks]
+    if store is not None:
+        store.flush()
+    return results, experiment.sink.records
+
+def _source_id(fetch_data: Callable) -> Optional[str]:
+    """
+    Hash of the pickled fetch_data and the bytecode it runs, so callable instances with other state and edited
+    functions get other ids. Closures and lambdas cannot be pickled and get None: their data is always fetched
+    and looked up by content. Global state that a function reads is not covered; pass a run_id for such sources.
+    """
+    try:
+        hasher = hashlib.sha256(pickle.dumps(fetch_data))
+    except Exception:
+        return None
+    function = getattr(fetch_data, "__func__", fetch_data)
+    code = getattr(function, "__code__", None) or getattr(getattr(type(fetch_data), "__call__", None), "__code__", None)
+    if code is not None:
+        hasher.update(marshal.dumps(code))
+    return hasher.hexdigest()
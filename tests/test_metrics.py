@@ -0,0 +1,36 @@
+import numpy as np
+from src.utils import Group
+from src.anova import ANOVAExperiment
+from src.ttest import TTestExperiment
+from src.sink import MemorySink
+
+def single_metric_results(experiment, matrices):
+    # perform_test on every metric column separately
+    results = []
+    for column in range(matrices[0].shape[1]):
+        for group, matrix in zip(experiment.groups, matrices):
+            group.clear()
+            group.extend(matrix[:, column])
+        results.append(experiment.perform_test())
+    return results
+
+def test_anova_matrix_matches_perform_test_per_column():
+    # Unequal variances in most columns, so the variance check picks Welch's ANOVA for them
+    rng = np.random.default_rng(0)
+    scales = rng.uniform(0.5, 3, (3, 50))
+    matrices = [rng.normal(0.1 * i, scales[i], (size, 50)) for i, size in enumerate((80, 40, 120))]
+    experiment = ANOVAExperiment([Group("A"), Group("B"), Group("C")], "anova", verbose=False, sink=MemorySink())
+    matrix_result = experiment.perform_test_matrix(*matrices)
+    results = single_metric_results(experiment, matrices)
+    assert np.round(matrix_result.statistic, 3).tolist() == [result.statistic for result in results]
+    assert np.round(matrix_result.p_value, 3).tolist() == [result.p_value for result in results]
+
+def test_ttest_matrix_matches_perform_test_per_column():
+    # Heavy tails with equal variances and unequal sizes, where Bartlett's test would often reject
+    rng = np.random.default_rng(1)
+    matrices = [rng.standard_t(3, (400, 200)), rng.standard_t(3, (150, 200)) + 0.1]
+    experiment = TTestExperiment([Group("A"), Group("B")], "ttest", verbose=False, sink=MemorySink())
+    matrix_result = experiment.perform_test_matrix(*matrices)
+    results = single_metric_results(experiment, matrices)
+    assert np.round(matrix_result.statistic, 3).tolist() == [result.statistic for result in results]
+    assert np.round(matrix_result.p_value, 3).tolist() == [result.p_value for result in results]
@@ -0,0 +1,27 @@
+import numpy as np
+from src.ols import batch_ols, simple_ols, statsmodels_ols
+
+FIELDS = ("slope", "intercept", "slope_se", "t_statistic", "p_value", "r_squared", "breusch_pagan_p", "durbin_watson")
+
+def test_simple_ols_matches_statsmodels():
+    # Heteroscedastic noise, so the Breusch-Pagan p-value is far from 1
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 10, 200)
+    y = 1.5 + 0.3 * x + rng.normal(0, 0.2 + 0.2 * x)
+    result, expected = simple_ols(x, y, 0.9), statsmodels_ols(x, y, 0.9)
+    assert result.nobs == expected.nobs
+    for name in FIELDS:
+        assert np.isclose(getattr(result, name), getattr(expected, name), rtol=1e-9, atol=1e-12), name
+    assert np.allclose(result.confidence_interval, expected.confidence_interval, rtol=1e-9)
+    assert np.allclose(result.residuals, expected.residuals, rtol=1e-9, atol=1e-12)
+
+def test_batch_ols_matches_single_fits():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(50, 4))
+    y = x * np.array([0.0, 0.5, -1.0, 2.0]) + rng.normal(size=(50, 4))
+    batch = batch_ols(x, y)
+    for column in range(4):
+        single = simple_ols(x[:, column], y[:, column])
+        for name in FIELDS:
+            assert np.isclose(getattr(batch, name)[column], getattr(single, name)), name
+        assert np.isclose(batch.ci_lower[column], single.confidence_interval[0])
@@ -0,0 +1,20 @@
+import numpy as np
+from src.utils import Group
+from src.anova import ANOVAExperiment
+
+def three_groups(i: int, num_data_points: int):
+    # Only the first repetition has unequal variances, so the reused checks decide between the classic and Welch's F
+    rng = np.random.default_rng(i)
+    return [rng.normal(0, 4 if i == 0 else 1, num_data_points), rng.normal(0.3, 1, num_data_points // 2),
+            rng.normal(0, 1, num_data_points // 3)]
+
+def results(num_workers: int, reuse_assumptions: bool):
+    experiment = ANOVAExperiment([Group("A"), Group("B"), Group("C")], "anova", seed=7, verbose=False,
+                                 reuse_assumptions=reuse_assumptions)
+    results, _ = experiment.run_experiment_multiple_times(three_groups, num_experiments=8, num_data_points=60,
+                                                          fetch_mode="experiment", num_workers=num_workers, chunksize=1)
+    return [(result.statistic, result.p_value, result.bootstrap_CI) for result in results]
+
+def test_results_do_not_depend_on_num_workers():
+    for reuse_assumptions in (False, True):
+        assert results(4, reuse_assumptions) == results(1, reuse_assumptions)
@@ -0,0 +1,15 @@
+import numpy as np
+from src.utils import Group
+from src.ttest import TTestExperiment
+
+def shifted_exponential(i: int, num_data_points: int):
+    rng = np.random.default_rng(i)
+    return [rng.exponential(size=num_data_points), rng.exponential(size=num_data_points) + 0.2]
+
+def test_corrected_permutation_p_values_keep_their_resolution():
+    # Stopping as soon as p < alpha would leave every p-value near 0.01, above the Bonferroni threshold of 0.005
+    experiment = TTestExperiment([Group("A"), Group("B")], "ttest", seed=1, verbose=False, inference="auto", num_permutations=1000)
+    results, aggregated = experiment.run_experiment_multiple_times(shifted_exponential, num_experiments=10, num_data_points=5000,
+                                                                   fetch_mode="experiment")
+    assert all(result.p_value < 0.005 for result in results)
+    assert aggregated.significant_results == 10
@@ -0,0 +1,58 @@
+import numpy as np
+from scipy import stats
+from src.moments import RunningMoments, moments_arrays
+from src.posthoc import (games_howell_from_moments, post_hoc_from_moments, studentized_range_isf, studentized_range_sf,
+                         tukey_hsd_from_moments)
+
+def test_studentized_range_matches_scipy():
+    # df below MIN_FAST_DF goes to scipy itself; the others use the vectorized quadrature
+    q = np.array([0.5, 1.0, 2.5, 3.5, 5.0, 8.0])
+    for k in (2, 3, 7):
+        for df in (5, 12.5, 40, 1000):
+            assert np.allclose(studentized_range_sf(q, k, df), stats.studentized_range.sf(q, k, df), rtol=0, atol=1e-8)
+    # scipy's quantiles are slow and switch to the infinite-df distribution above 1e5, so only a few are compared
+    df = np.array([5, 30, 1e4])
+    assert np.allclose(studentized_range_isf(0.05, 4, df), stats.studentized_range.isf(0.05, 4, df), rtol=1e-7)
+    # Many distinct df are interpolated in 1/df
+    df = np.linspace(6, 500, 40)
+    assert np.allclose(studentized_range_isf(0.01, 4, df)[::13], stats.studentized_range.isf(0.01, 4, df[::13]), rtol=1e-6)
+    # For two groups the studentized range is sqrt(2) |t|, which also covers large df
+    df = np.array([7, 50, 1e6, 1e9])
+    assert np.allclose(studentized_range_isf(0.05, 2, df), np.sqrt(2) * stats.t.isf(0.025, df), rtol=1e-8)
+
+def test_tukey_hsd_matches_scipy():
+    rng = np.random.default_rng(0)
+    samples = [rng.normal(mean, 1, size) for mean, size in ((0, 30), (0.5, 25), (0.2, 40), (1.0, 12))]
+    expected = stats.tukey_hsd(*samples)
+    interval = expected.confidence_interval(0.95)
+    differences, _, p_values, lower, upper = tukey_hsd_from_moments(*moments_arrays([RunningMoments.from_array(s) for s in samples]))
+    first, second = np.triu_indices(len(samples), 1)
+    assert np.allclose(differences, expected.statistic[first, second])
+    assert np.allclose(p_values, expected.pvalue[first, second], rtol=0, atol=1e-8)
+    assert np.allclose(lower, interval.low[first, second], rtol=1e-7)
+    assert np.allclose(upper, interval.high[first, second], rtol=1e-7)
+
+def test_games_howell_matches_its_definition():
+    # Per-pair Welch standard errors and degrees of freedom with scipy's studentized range
+    rng = np.random.default_rng(2)
+    samples = [rng.normal(mean, scale, size) for mean, scale, size in ((0, 1, 30), (0.8, 3, 20), (0.3, 0.5, 45))]
+    _, statistic, p_values, lower, upper = games_howell_from_moments(*moments_arrays([RunningMoments.from_array(s) for s in samples]))
+    for pair, (i, j) in enumerate(zip(*np.triu_indices(len(samples), 1))):
+        a, b = samples[i], samples[j]
+        va, vb = np.var(a, ddof=1) / len(a), np.var(b, ddof=1) / len(b)
+        df = (va + vb) ** 2 / (va ** 2 / (len(a) - 1) + vb ** 2 / (len(b) - 1))
+        se = np.sqrt((va + vb) / 2)
+        q = abs(np.mean(a) - np.mean(b)) / se
+        margin = stats.studentized_range.isf(0.05, len(samples), df) * se
+        assert np.isclose(statistic[pair], q)
+        assert np.isclose(p_values[pair], stats.studentized_range.sf(q, len(samples), df), rtol=0, atol=1e-8)
+        assert np.allclose([lower[pair], upper[pair]], [np.mean(a) - np.mean(b) - margin, np.mean(a) - np.mean(b) + margin], rtol=1e-7)
+
+def test_post_hoc_rounds_and_rejects():
+    rng = np.random.default_rng(1)
+    samples = [rng.normal(mean, 1, 50) for mean in (0, 0, 1.5)]
+    result = post_hoc_from_moments(["A", "B", "C"], [RunningMoments.from_array(s) for s in samples])
+    expected = stats.tukey_hsd(*samples).pvalue
+    assert [(c.group1, c.group2) for c in result.comparisons] == [("A", "B"), ("A", "C"), ("B", "C")]
+    assert [c.p_value for c in result.comparisons] == [round(float(expected[i, j]), 3) for i, j in ((0, 1), (0, 2), (1, 2))]
+    assert [(c.group1, c.group2) for c in result.significant()] == [("A", "C"), ("B", "C")]
@@ -0,0 +1,17 @@
+import numpy as np
+import statsmodels.stats.power as smp
+from src.power import solve_sample_size, solve_sample_sizes
+
+EFFECT_SIZES = (0.05, 0.2, 0.5, 0.8, 1.2)
+
+def test_ttest_sample_sizes_match_statsmodels():
+    for effect_size in EFFECT_SIZES:
+        expected = smp.TTestIndPower().solve_power(effect_size=effect_size, alpha=0.05, power=0.8)
+        assert np.isclose(solve_sample_size(effect_size), expected, rtol=1e-6)
+    assert np.allclose(solve_sample_sizes(EFFECT_SIZES), [solve_sample_size(d) for d in EFFECT_SIZES], rtol=1e-7)
+
+def test_anova_sample_sizes_match_statsmodels():
+    for k_groups in (2, 3, 6):
+        for effect_size in EFFECT_SIZES:
+            expected = smp.FTestAnovaPower().solve_power(effect_size=effect_size, alpha=0.01, power=0.9, k_groups=k_groups)
+            assert np.isclose(solve_sample_size(effect_size, 0.01, 0.9, k_groups, "anova"), expected, rtol=1e-6)
@@ -0,0 +1,19 @@
+import numpy as np
+from scipy import stats
+from src.sequential import alpha_spent, sequential_boundaries
+
+def test_boundaries_match_published_values():
+    # Lan-DeMets boundaries for five equally spaced looks at two-sided alpha = 0.05, as tabulated by ldbounds and gsDesign
+    fractions = np.linspace(0.2, 1, 5)
+    assert np.allclose(sequential_boundaries(fractions), [4.877, 3.357, 2.680, 2.290, 2.031], atol=1e-3)
+    assert np.allclose(sequential_boundaries(fractions, spending="pocock"), [2.438, 2.427, 2.410, 2.397, 2.386], atol=1e-3)
+
+def test_boundaries_spend_alpha():
+    # Probability under H0 of crossing by each look, from the multivariate normal of the z statistics
+    fractions = np.array([0.3, 0.6, 1.0])
+    boundaries = sequential_boundaries(fractions)
+    covariance = np.sqrt(np.minimum.outer(fractions, fractions) / np.maximum.outer(fractions, fractions))
+    for k in range(1, len(fractions) + 1):
+        distribution = stats.multivariate_normal(np.zeros(k), covariance[:k, :k], seed=0)
+        crossed = 1 - distribution.cdf(boundaries[:k], lower_limit=-boundaries[:k])
+        assert np.isclose(crossed, alpha_spent(fractions[k - 1]), rtol=0, atol=1e-6)
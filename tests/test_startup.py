@@ -0,0 +1,11 @@
+import os
+from src.startup import check_import_budget
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_engine_imports_within_budget(monkeypatch):
+    # Each engine is imported in a fresh interpreter, which resolves src from the working directory
+    monkeypatch.chdir(ROOT)
+    results = check_import_budget()
+    failures = [str(result) for result in results if not result.within_budget]
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,27 @@
+import numpy as np
+from src.state import QuantileSketch
+
+QUANTILES = np.array([0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0])
+
+def sketch_of(values, relative_accuracy=0.01) -> QuantileSketch:
+    sketch = QuantileSketch(relative_accuracy)
+    sketch.add(values)
+    return sketch
+
+def test_quantiles_within_relative_accuracy():
+    rng = np.random.default_rng(0)
+    for values in (rng.lognormal(0, 2, 10_000), rng.standard_t(3, 5_000), np.concatenate([np.zeros(100), rng.exponential(size=900)])):
+        for relative_accuracy in (0.01, 0.05):
+            estimates = sketch_of(values, relative_accuracy).quantile(QUANTILES)
+            exact = np.quantile(values, QUANTILES, method="lower")
+            assert np.all(np.abs(estimates - exact) <= relative_accuracy * np.abs(exact) + 1e-12)
+
+def test_merge_equals_sketch_of_all_values():
+    rng = np.random.default_rng(1)
+    shards = [rng.normal(size=size) for size in (10, 1000, 333)]
+    merged = sketch_of(shards[0]).merge(sketch_of(shards[1])).merge(sketch_of(shards[2]))
+    other_order = sketch_of(shards[2]).merge(sketch_of(shards[0]).merge(sketch_of(shards[1])))
+    combined = sketch_of(np.concatenate(shards))
+    for sketch in (merged, other_order, QuantileSketch.from_dict(merged.to_dict())):
+        assert sketch.count == combined.count
+        assert np.array_equal(sketch.quantile(QUANTILES), combined.quantile(QUANTILES))
@@ -0,0 +1,25 @@
+import numpy as np
+from src.utils import Group
+from src.ttest import TTestExperiment
+from src.store import ResultStore
+
+def unequal_groups(i: int, num_data_points: int):
+    # The first repetition has unequal variances, so reusing its checks switches every repetition to Welch's test
+    rng = np.random.default_rng(i)
+    return [rng.normal(0, 3 if i == 0 else 1, num_data_points), rng.normal(0.2, 1, num_data_points // 4)]
+
+def p_values(store, reuse_assumptions: bool):
+    experiment = TTestExperiment([Group("A"), Group("B")], "ttest", seed=3, verbose=False, reuse_assumptions=reuse_assumptions)
+    results, _ = experiment.run_experiment_multiple_times(unequal_groups, num_experiments=6, num_data_points=60,
+                                                          fetch_mode="experiment", store=store)
+    return [result.p_value for result in results]
+
+def test_reuse_assumptions_is_part_of_the_key(tmp_path):
+    reused, separate = p_values(None, True), p_values(None, False)
+    assert reused != separate
+    store = ResultStore(str(tmp_path))
+    assert p_values(store, True) == reused
+    assert p_values(store, False) == separate
+    # Resumed from disk, with the reused checks computed again from the first repetition
+    assert p_values(ResultStore(str(tmp_path)), True) == reused
+    assert p_values(ResultStore(str(tmp_path)), False) == separate